@@ -3,6 +3,14 @@ import django_describer.datatypes
 import django_describer.permissions
 import django_describer.describers
 import django_describer.utils
-import django_describer.adapters
 
 name = "django_describer"
+
+
+def __getattr__(attr):
+    # the adapters import contenttypes models, so they are imported on first use to keep django_describer installable
+    # in INSTALLED_APPS
+    if attr == "adapters":
+        import django_describer.adapters
+        return django_describer.adapters
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, attr))
@@ -1,7 +1,15 @@
 from enum import Enum
 
+import django
+from django.db import transaction, connections, router
+from django.db.models import Q, AutoField
+
 from django_describer.permissions import AllowAll
-from .utils import ensure_tuple, set_param_if_unset, get_object_or_raise, build_extra_fields, determine_fields
+from .changes import record_changes, is_change_logged
+from .counters import get_counters_of
+from .entities import load_entity, invalidate_entities
+from .utils import ensure_tuple, set_param_if_unset, get_object_or_raise, build_extra_fields, determine_fields, \
+    get_local_fields, is_numeric_field, is_unique_key, model_singular_name
 
 
 class ActionName(Enum):
@@ -10,6 +18,9 @@ class ActionName(Enum):
     DELETE = "delete"
     LIST = "list"
     DETAIL = "detail"
+    AGGREGATE = "aggregate"
+    CHANGES = "changes"
+    UPSERT = "upsert"
 
     @classmethod
     def values(cls):
@@ -25,7 +36,7 @@ def default_create(model):
 
 
 def default_update(request, instance, data):
-    for k, v in data:
+    for k, v in data.items():
         setattr(instance, k, v)
     instance.save()
     return {"object": instance}
@@ -36,9 +47,142 @@ def default_delete(request, instance, data):
     return {"object": instance}
 
 
+def insert_on_conflict(model, unique_fields, update_fields, rows):
+    """
+    Executes INSERT ... ON CONFLICT (unique_fields) DO UPDATE of update_fields for the rows, which Django < 4.1 cannot
+    build. Supported by PostgreSQL and SQLite 3.24+. Fields missing in the rows get their defaults when inserted.
+    Like in bulk_create(), the primary key is left to the database only if it is an AutoField.
+    """
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    objs = [model(**row) for row in rows]
+    fields = [field for field in model._meta.concrete_fields
+              if not isinstance(field, AutoField) or field.attname in unique_fields]
+
+    conflict = ", ".join(qn(model._meta.get_field(field).column) for field in unique_fields)
+    if update_fields:
+        on_conflict = "DO UPDATE SET {}".format(", ".join(
+            "{0} = EXCLUDED.{0}".format(qn(model._meta.get_field(field).column)) for field in update_fields))
+    else:
+        # nothing to update, existing rows are left as they are
+        on_conflict = "DO NOTHING"
+
+    batch_size = connection.ops.bulk_batch_size(fields, objs) or len(objs)
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            sql = "INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) {}".format(
+                qn(model._meta.db_table),
+                ", ".join(qn(field.column) for field in fields),
+                ", ".join("({})".format(", ".join(["%s"] * len(fields))) for _ in batch),
+                conflict,
+                on_conflict,
+            )
+            cursor.execute(sql, [field.get_db_prep_save(field.pre_save(obj, True), connection=connection)
+                                 for obj in batch for field in fields])
+
+
+def supports_upsert(connection):
+    """
+    Returns whether the database can insert rows or update the conflicting ones of a unique key in one statement.
+    """
+    if django.VERSION < (4, 1):
+        return connection.vendor in ("postgresql", "sqlite")
+    return connection.features.supports_update_conflicts_with_target
+
+
+def default_upsert(model, unique_fields):
+    """
+    Inserts the rows, or updates the objects with the same values of unique_fields, by INSERT ... ON CONFLICT DO
+    UPDATE statements, one per set of fields provided by the rows, so that rows never overwrite fields they lack.
+    The objects are fetched by a single query then. Django < 4.1 builds the statements by insert_on_conflict.
+    Databases which cannot update conflicting rows fall back to update_or_create() per row.
+
+    The statements send no signals, so cached objects are invalidated directly, and the change log and counter fields
+    are updated from the objects locked before the statements.
+    """
+    def fn(request, rows):
+        if not rows:
+            return []
+
+        if not supports_upsert(connections[router.db_for_write(model)]):
+            with transaction.atomic():
+                return [model._default_manager.update_or_create(
+                    defaults={field: value for field, value in row.items() if field not in unique_fields},
+                    **{field: row[field] for field in unique_fields})[0] for row in rows]
+
+        with transaction.atomic():
+            counters = get_counters_of(model)
+            before = {}
+            if counters or is_change_logged(model):
+                before = fetch_by_unique_key(model, unique_fields, rows, lock=True)
+
+            groups = {}  # key: fields provided by the rows, value: rows
+            for row in rows:
+                groups.setdefault(frozenset(row), []).append(row)
+
+            for fields, group in groups.items():
+                update_fields = sorted(fields - set(unique_fields))
+                if django.VERSION < (4, 1):
+                    insert_on_conflict(model, unique_fields, update_fields, group)
+                elif update_fields:
+                    model._default_manager.bulk_create([model(**row) for row in group], update_conflicts=True,
+                                                       unique_fields=unique_fields, update_fields=update_fields)
+                else:
+                    model._default_manager.bulk_create([model(**row) for row in group], ignore_conflicts=True)
+
+            # some databases do not return primary keys of updated rows, and the rows lack fields of existing objects
+            existing = fetch_by_unique_key(model, unique_fields, rows)
+            objs = [existing[unique_key(model, unique_fields, row)] for row in rows]
+
+            invalidate_entities(model, [obj.pk for obj in objs])
+
+            if counters or is_change_logged(model):
+                written = {unique_key(model, unique_fields, row): obj for row, obj in zip(rows, objs)}
+                for counter in counters:
+                    for key, obj in written.items():
+                        old = before.get(key, None)
+                        counter.move(getattr(old, counter.attname) if old is not None else None,
+                                     getattr(obj, counter.attname))
+                record_changes(model, [obj.pk for key, obj in written.items() if key not in before],
+                               [obj.pk for key, obj in written.items() if key in before])
+            return objs
+    return fn
+
+
+def unique_key(model, unique_fields, row):
+    return tuple(model._meta.get_field(field).to_python(row[field]) for field in unique_fields)
+
+
+def fetch_by_unique_key(model, unique_fields, rows, lock=False):
+    """
+    Returns existing objects matching the rows in a single query, key: tuple of unique field values, value: object.
+    With lock, they are selected for update, which needs a transaction.
+    """
+    keys = {unique_key(model, unique_fields, row) for row in rows}
+    if not keys:
+        return {}
+
+    if len(unique_fields) == 1:
+        qs = model._default_manager.filter(**{"{}__in".format(unique_fields[0]): [key[0] for key in keys]})
+    else:
+        condition = Q()
+        for key in keys:
+            condition |= Q(**dict(zip(unique_fields, key)))
+        qs = model._default_manager.filter(condition)
+
+    if lock:
+        qs = qs.select_for_update()
+    return {tuple(getattr(obj, field) for field in unique_fields): obj for obj in qs}
+
+
 class BaseAction:
+    __slots__ = ("permissions", "_describer", "_name")
+
     read_only = False
     has_model = True
+    has_bulk_form = False
+    async_exec = False
 
     def __init__(self, permissions=None):
         self.permissions = ensure_tuple(permissions)
@@ -72,6 +216,8 @@ class BaseAction:
 
 
 class RetrieveAction(BaseAction):
+    __slots__ = ("fetch_fn",)
+
     read_only = True
 
     def __init__(self, permissions=None, fetch_fn=None):
@@ -86,6 +232,8 @@ class RetrieveAction(BaseAction):
 
 
 class ListAction(RetrieveAction):
+    __slots__ = ()
+
     def get_default_fetch_fn(self):
         def fn(request):
             return self._describer.model.objects.all()
@@ -96,22 +244,105 @@ class ListAction(RetrieveAction):
 
 
 class DetailAction(RetrieveAction):
+    __slots__ = ("id_arg",)
+
     def __init__(self, permissions=None, fetch_fn=None, id_arg=True):
         super().__init__(permissions=permissions, fetch_fn=fetch_fn)
         self.id_arg = id_arg
 
     def get_default_fetch_fn(self):
         def fn(request, pk):
-            return get_object_or_raise(self._describer.model, pk)
+            # objects loaded earlier in the request, or cached, are not fetched again
+            model = self._describer.model
+            obj = load_entity(request, model, pk)
+            if obj is None:
+                raise ValueError("`{}` with pk={} does not exist.".format(model_singular_name(model), pk))
+            return obj
         return fn
 
     def convert(self, to, **kwargs):
         return to.detail_action(self, **kwargs)
 
 
+class AggregateAction(RetrieveAction):
+    """
+    Computes count, sum, avg, min and max of numeric fields in the database, optionally grouped by some fields.
+    """
+
+    __slots__ = ("fields", "group_by")
+
+    def __init__(self, permissions=None, fetch_fn=None, fields=None, group_by=None):
+        super().__init__(permissions=permissions, fetch_fn=fetch_fn)
+        self.fields = ensure_tuple(fields, convert_none=False)
+        self.group_by = ensure_tuple(group_by)
+
+    def get_default_fetch_fn(self):
+        def fn(request):
+            return self._describer.model.objects.all()
+        return fn
+
+    def determine_fields(self):
+        """
+        Fields to aggregate. Defaults to all numeric non-pk fields exposed by the describer.
+        """
+        model = self._describer.model
+        if self.fields is None:
+            return tuple(name for name, field in get_local_fields(model)
+                         if is_numeric_field(field) and not field.primary_key and name in self._describer.get_fields())
+
+        fields = determine_fields(model, self.fields, None, no_reverse=True)
+        for field in fields:
+            if field not in self._describer.get_fields():
+                raise ValueError("`{}` of `{}` is not exposed, it cannot be aggregated.".format(field, model.__name__))
+            if not is_numeric_field(model._meta.get_field(field)):
+                raise ValueError("`{}` of `{}` is not numeric, it cannot be aggregated.".format(field, model.__name__))
+        return fields
+
+    def determine_group_by(self):
+        """
+        Fields the results can be grouped by. Foreign keys are grouped by their raw id values.
+        """
+        if not self.group_by:
+            return ()
+        model = self._describer.model
+        fields = determine_fields(model, self.group_by, None, no_reverse=True)
+        return tuple(model._meta.get_field(field).attname for field in fields)
+
+    def convert(self, to, **kwargs):
+        return to.aggregate_action(self, **kwargs)
+
+
+class ChangesAction(BaseAction):
+    """
+    Returns ids of objects created, updated and deleted since a cursor, read from a change log populated by signals.
+    """
+
+    __slots__ = ("page_size", "settle_time")
+
+    read_only = True
+
+    def __init__(self, permissions=None, page_size=1000, settle_time=10):
+        """
+        settle_time: seconds after which changes are delivered on databases other than PostgreSQL and SQLite, which
+            cannot tell whether earlier transactions are still running.
+        """
+        super().__init__(permissions=permissions)
+        self.page_size = page_size
+        self.settle_time = settle_time
+
+    def convert(self, to, **kwargs):
+        return to.changes_action(self, **kwargs)
+
+
 class ModifyAction(BaseAction):
+    __slots__ = ("only_fields", "exclude_fields", "extra_fields", "exec_fn", "return_fields", "field_kwargs",
+                 "foreign_key_permissions")
+
     def __init__(self, permissions=None, only_fields=None, exclude_fields=None, extra_fields=None, exec_fn=None,
-                 return_fields=None, field_kwargs=None):
+                 return_fields=None, field_kwargs=None, foreign_key_permissions=None):
+        """
+        foreign_key_permissions: key: foreign key name, value: permissions checked on the referenced object.
+        """
         super().__init__(permissions=permissions)
         self.only_fields = ensure_tuple(only_fields, convert_none=False)
         self.exclude_fields = ensure_tuple(exclude_fields, convert_none=False)
@@ -119,6 +350,8 @@ class ModifyAction(BaseAction):
         self.exec_fn = exec_fn
         self.return_fields = build_extra_fields(return_fields)
         self.field_kwargs = field_kwargs or {}
+        self.foreign_key_permissions = {name: ensure_tuple(permissions)
+                                        for name, permissions in (foreign_key_permissions or {}).items()}
 
     def get_exec_fn(self):
         return self.exec_fn or self.get_default_exec_fn()
@@ -137,6 +370,8 @@ class ModifyAction(BaseAction):
 
 
 class CreateAction(ModifyAction):
+    __slots__ = ()
+
     def get_default_exec_fn(self):
         return default_create(self._describer.model)
 
@@ -153,11 +388,13 @@ class CreateAction(ModifyAction):
 
 
 class FetchModifyAction(ModifyAction):
+    __slots__ = ("fetch_fn",)
+
     def __init__(self, permissions=None, only_fields=None, exclude_fields=None, extra_fields=None, exec_fn=None,
-                 return_fields=None, field_kwargs=None, fetch_fn=None):
+                 return_fields=None, field_kwargs=None, fetch_fn=None, foreign_key_permissions=None):
         super().__init__(permissions=permissions, only_fields=only_fields, exclude_fields=exclude_fields,
                          extra_fields=extra_fields, exec_fn=exec_fn, return_fields=return_fields,
-                         field_kwargs=field_kwargs)
+                         field_kwargs=field_kwargs, foreign_key_permissions=foreign_key_permissions)
         self.fetch_fn = fetch_fn
 
     def get_fetch_fn(self):
@@ -170,6 +407,8 @@ class FetchModifyAction(ModifyAction):
 
 
 class UpdateAction(FetchModifyAction):
+    __slots__ = ()
+
     def get_default_exec_fn(self):
         return default_update
 
@@ -186,7 +425,59 @@ class UpdateAction(FetchModifyAction):
         return to.update_action(self, **kwargs)
 
 
+class UpsertAction(ModifyAction):
+    """
+    Creates an object, or updates the one with the same values of unique_fields, which have to form a unique key.
+    Adapters expose a single and a bulk form. create_permissions are checked for rows to be inserted, update_permissions
+    for the objects to be updated; the existing objects are fetched by a single query only if any of them are set.
+    """
+
+    __slots__ = ("unique_fields", "create_permissions", "update_permissions")
+
+    has_bulk_form = True
+
+    def __init__(self, unique_fields, permissions=None, create_permissions=None, update_permissions=None,
+                 only_fields=None, exclude_fields=None, exec_fn=None, return_fields=None, field_kwargs=None,
+                 foreign_key_permissions=None):
+        super().__init__(permissions=permissions, only_fields=only_fields, exclude_fields=exclude_fields,
+                         exec_fn=exec_fn, return_fields=return_fields, field_kwargs=field_kwargs,
+                         foreign_key_permissions=foreign_key_permissions)
+        self.unique_fields = ensure_tuple(unique_fields)
+        self.create_permissions = ensure_tuple(create_permissions)
+        self.update_permissions = ensure_tuple(update_permissions)
+
+    def get_unique_fields(self):
+        """
+        Returns attnames of the unique key, i. e. foreign keys as `<name>_id`, matching the input data.
+        """
+        model = self._describer.model
+        if not is_unique_key(model, self.unique_fields):
+            raise ValueError("`{}` is not a unique key of `{}`.".format(", ".join(self.unique_fields), model.__name__))
+        return tuple(model._meta.get_field(field).attname for field in self.unique_fields)
+
+    def get_default_exec_fn(self):
+        return default_upsert(self._describer.model, self.get_unique_fields())
+
+    def get_default_return_fields(self):
+        return {"object": self._describer.model}
+
+    def determine_fields(self):
+        fields = super().determine_fields()
+        return tuple(f for f in fields if f != "id" or "id" in self.unique_fields)
+
+    def fetch_existing(self, rows, lock=False):
+        return fetch_by_unique_key(self._describer.model, self.get_unique_fields(), rows, lock=lock)
+
+    def get_unique_key(self, row):
+        return unique_key(self._describer.model, self.get_unique_fields(), row)
+
+    def convert(self, to, **kwargs):
+        return to.upsert_action(self, **kwargs)
+
+
 class DeleteAction(FetchModifyAction):
+    __slots__ = ()
+
     def __init__(self, permissions=None, extra_fields=None, exec_fn=None, return_fields=None, field_kwargs=None,
                  fetch_fn=None):
         super().__init__(permissions=permissions, extra_fields=extra_fields, exec_fn=exec_fn,
@@ -206,11 +497,17 @@ class DeleteAction(FetchModifyAction):
 
 
 class CustomAction(ModifyAction):
+    __slots__ = ("input_type", "async_exec")
+
     has_model = False
 
-    def __init__(self, input_type, return_fields, exec_fn, permissions=None):
+    def __init__(self, input_type, return_fields, exec_fn, permissions=None, async_exec=False):
+        """
+        async_exec: run exec_fn in the background, the mutation returns a job instead of return_fields.
+        """
         super().__init__(permissions=permissions, exec_fn=exec_fn, return_fields=return_fields)
         self.input_type = input_type
+        self.async_exec = async_exec
 
     def get_default_exec_fn(self):
         raise ValueError("No default exec_fn, you need to provide one.")
@@ -223,9 +520,16 @@ class CustomAction(ModifyAction):
 
 
 class CustomObjectAction(UpdateAction):
-    def __init__(self, permissions=None, extra_fields=None, exec_fn=None, return_fields=None, fetch_fn=None):
+    __slots__ = ("async_exec",)
+
+    def __init__(self, permissions=None, extra_fields=None, exec_fn=None, return_fields=None, fetch_fn=None,
+                 async_exec=False):
+        """
+        async_exec: run exec_fn in the background, the mutation returns a job instead of return_fields.
+        """
         super().__init__(permissions=permissions, only_fields=(), exclude_fields=None,
                          extra_fields=extra_fields, exec_fn=exec_fn, return_fields=return_fields, fetch_fn=fetch_fn)
+        self.async_exec = async_exec
 
     def get_default_exec_fn(self):
         raise ValueError("No default exec_fn, you need to provide one.")
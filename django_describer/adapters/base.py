@@ -29,12 +29,21 @@ class Adapter:
     def detail_action(self, action, **kwargs):
         raise NotImplementedError
 
+    def aggregate_action(self, action, **kwargs):
+        raise NotImplementedError
+
+    def changes_action(self, action, **kwargs):
+        raise NotImplementedError
+
     def create_action(self, action, **kwargs):
         raise NotImplementedError
 
     def update_action(self, action, **kwargs):
         raise NotImplementedError
 
+    def upsert_action(self, action, **kwargs):
+        raise NotImplementedError
+
     def delete_action(self, action, **kwargs):
         raise NotImplementedError
 
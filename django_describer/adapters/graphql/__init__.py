@@ -4,3 +4,7 @@ import django_describer.adapters.graphql.fields
 import django_describer.adapters.graphql.retrieving
 import django_describer.adapters.graphql.pagination
 import django_describer.adapters.graphql.converter
+import django_describer.adapters.graphql.views
+import django_describer.adapters.graphql.filters
+import django_describer.adapters.graphql.artifacts
+import django_describer.adapters.graphql.coalescing
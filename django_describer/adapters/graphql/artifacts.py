@@ -0,0 +1,175 @@
+import json
+import os
+
+from graphql import build_ast_schema, parse, validate
+from graphql.error import GraphQLError
+
+from ..utils import non_model_actions
+from ...describers import get_describers
+from ...permissions import Or
+from ...utils import get_model_meta
+from .retrieving import create_ordering_fields, get_unindexed_exposures
+
+
+SDL_FILE_NAME = "schema.graphql"
+MANIFEST_FILE_NAME = "schema.json"
+
+
+def permission_names(permissions):
+    ret = []
+    for permission in permissions:
+        if isinstance(permission, Or):
+            ret.append("Or({})".format(", ".join(permission_names(permission.permissions))))
+        else:
+            ret.append(getattr(permission, "__name__", permission.__class__.__name__))
+    return ret
+
+
+def _field_kind(field):
+    if field.one_to_many or field.many_to_many:
+        return "list"
+    if field.is_relation:
+        return "object"
+    return "column"
+
+
+def _action_manifest(action):
+    return {
+        "action": action.__class__.__name__,
+        "read_only": action.read_only,
+        "permissions": permission_names(action.get_permissions()),
+    }
+
+
+def _describer_manifest(adapter, describer):
+    model = describer.model
+    meta = get_model_meta(model)
+    type_class = adapter.type_classes[model]
+
+    filter_fields = type_class._meta.filter_fields
+    ordering_fields = create_ordering_fields(describer)
+    unindexed_filters, unindexed_ordering = get_unindexed_exposures(describer, filter_fields, ordering_fields)
+
+    fields = {}
+    for name in describer.get_fields():
+        permissions = describer.get_field_permissions().get(name, describer.get_default_field_permissions())
+        fields[name] = {
+            "kind": _field_kind(meta.fields_by_name[name]),
+            "permissions": permission_names(permissions),
+        }
+
+    # extra fields are computed by python per object, unless annotated by the database
+    for name, return_type in describer.get_extra_fields().items():
+        fields[name] = {
+            "kind": "annotated" if getattr(return_type, "expression", None) is not None else "extra",
+            "type": return_type.__class__.__name__,
+            "permissions": [],
+        }
+
+    return {
+        "model": "{}.{}".format(model._meta.app_label, model.__name__),
+        "type": type_class.__name__,
+        "fields": fields,
+        "filters": {name: list(lookups) for name, lookups in sorted(filter_fields.items())},
+        "ordering": list(ordering_fields) if ordering_fields is not None else None,
+        "actions": {action.get_name(): _action_manifest(action) for action in describer.get_actions()},
+        "cost": {
+            "default_page_size": describer.default_page_size,
+            "max_page_size": describer.max_page_size,
+            "max_unpaginated_rows": describer.max_unpaginated_rows,
+            "unindexed_filters": unindexed_filters,
+            "unindexed_ordering": unindexed_ordering,
+        },
+    }
+
+
+def build_manifest(adapter):
+    """
+    Describes types, fields, filters, permissions and cost hints of a generated schema in a JSON-serializable dict.
+    The adapter must have generated its schema already.
+    """
+    return {
+        "describers": {describer.model.__name__: _describer_manifest(adapter, describer)
+                       for describer in get_describers()},
+        "actions": {action.get_name(): _action_manifest(action) for action in non_model_actions},
+    }
+
+
+def role_sdl_file_name(role):
+    return "schema.{}.graphql".format(role)
+
+
+def export_artifact(adapter, directory):
+    """
+    Generates the schema and the pruned schemas of the adapter's roles, and writes their SDL and the manifest into
+    the directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    roles = {}  # key: role, value: SDL file name
+    for role in adapter.roles or ():
+        roles[str(role)] = role_sdl_file_name(role)
+        with open(os.path.join(directory, roles[str(role)]), "w") as f:
+            f.write(str(adapter.generate_schema(role=role)))
+
+    # the manifest describes the full schema, generated last
+    schema = adapter.generate_schema()
+    with open(os.path.join(directory, SDL_FILE_NAME), "w") as f:
+        f.write(str(schema))
+
+    manifest = build_manifest(adapter)
+    manifest["roles"] = roles
+    with open(os.path.join(directory, MANIFEST_FILE_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+class SchemaArtifact:
+    """
+    A prebuilt schema, able to validate queries without the describers, models and graphene.
+    """
+
+    def __init__(self, sdl, manifest):
+        self.schema = build_ast_schema(parse(sdl))
+        self.manifest = manifest
+
+    @classmethod
+    def load(cls, directory, role=None):
+        """
+        Loads the full schema of the artifact, or the schema of the role.
+        """
+        with open(os.path.join(directory, SDL_FILE_NAME if role is None else role_sdl_file_name(role))) as f:
+            sdl = f.read()
+        with open(os.path.join(directory, MANIFEST_FILE_NAME)) as f:
+            manifest = json.load(f)
+        return cls(sdl, manifest)
+
+    def validate(self, query):
+        """
+        Returns a list of GraphQLErrors, empty if the query is valid.
+        """
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return [e]
+        return validate(self.schema, document)
+
+
+def diff_manifests(old, new, path=()):
+    """
+    Returns a list of differences between two manifests as (change, path, old value, new value), where change is
+    one of "added", "removed" and "changed".
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        if old != new:
+            return [("changed", path, old, new)]
+        return []
+
+    ret = []
+    for key in sorted(set(old) | set(new)):
+        if key not in old:
+            ret.append(("added", path + (key,), None, new[key]))
+        elif key not in new:
+            ret.append(("removed", path + (key,), old[key], None))
+        else:
+            ret.extend(diff_manifests(old[key], new[key], path + (key,)))
+    return ret
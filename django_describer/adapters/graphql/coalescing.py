@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from functools import lru_cache
+
+from graphql import parse, GraphQLError
+from graphql.language.printer import print_ast
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Concurrent callers with the same key wait for the running call and share
+    its result, which is also reused for ttl seconds after it has finished.
+    """
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._calls = {}  # key: hashable, value: _Call
+
+    def _purge(self, now):
+        expired = [key for key, call in self._calls.items() if call.expires is not None and call.expires <= now]
+        for key in expired:
+            del self._calls[key]
+
+    def do(self, key, fn):
+        with self._lock:
+            self._purge(time.monotonic())
+            call = self._calls.get(key, None)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self.ttl > 0 and call.error is None:
+                    call.expires = time.monotonic() + self.ttl
+                elif self._calls.get(key, None) is call:
+                    del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+def default_coalesce_key(request):
+    """
+    Anonymous requests share results, authenticated ones only with requests of the same user.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return "user:{}".format(user.pk)
+    return "anonymous"
+
+
+@lru_cache(maxsize=1024)
+def normalize_query(query):
+    """
+    Returns the query printed from its AST, so that formatting does not matter while string literals are kept intact.
+    Invalid queries are returned as they are.
+    """
+    try:
+        return print_ast(parse(query))
+    except GraphQLError:
+        return query
+
+
+def operation_key(query, variables, operation_name, permission_key):
+    return (
+        normalize_query(query),
+        json.dumps(variables, sort_keys=True, default=str) if variables else None,
+        operation_name,
+        permission_key,
+    )
@@ -10,9 +10,17 @@ from graphene_django_extras.registry import get_global_registry
 from graphene_django_extras.utils import is_required
 
 from .fields import DjangoNestableListObjectPermissionsField
+from ...describers import get_describer
 from ...utils import get_local_fields
 
 
+def get_counter_field(field):
+    describer = get_describer(field.model)
+    if describer is None or not isinstance(field, django.db.models.ManyToOneRel):
+        return None
+    return describer.get_counter_field(field.get_accessor_name())
+
+
 @convert_django_field.register(GenericRel)
 @convert_django_field.register(django.db.models.ManyToManyRel)
 @convert_django_field.register(django.db.models.ManyToOneRel)
@@ -45,6 +53,7 @@ def convert_many_rel_to_djangomodel(
                     _type,
                     required=is_required(field) and input_flag == "create",
                     filterset_class=_type._meta.filterset_class,
+                    counter_field=get_counter_field(field),
                 )
             else:
                 return DjangoListField(
@@ -65,7 +74,8 @@ def convert_local_fields(model, convertable_fields):
         django.db.models.fields.AutoField: django.db.models.IntegerField
     }
 
-    fields = [[name, deepcopy(field)] for name, field in get_local_fields(model)]
+    # copy only the fields which are going to be converted
+    fields = [[name, deepcopy(field)] for name, field in get_local_fields(model) if name in convertable_fields]
 
     for i in range(len(fields)):
         # change a field's type if necessary
@@ -80,9 +90,7 @@ def convert_local_fields(model, convertable_fields):
     ret = OrderedDict()
 
     for name, field in fields:
-        if name not in convertable_fields:
-            continue
         converted = convert_django_field_with_choices(field, get_global_registry())
         ret[name] = converted
 
-    return ret
\ No newline at end of file
+    return ret
@@ -0,0 +1,280 @@
+import importlib
+import json
+import re
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+def import_optional(module_name, feature):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        raise ValueError("{} requires the `{}` package.".format(feature, module_name))
+
+
+class Encoding:
+    """
+    Serializes response dicts into a media type. join() builds an array of already encoded items, for batches.
+    """
+
+    name = None
+    content_type = None
+    media_types = ()
+
+    def encode(self, d):
+        raise NotImplementedError
+
+    def join(self, items):
+        raise NotImplementedError
+
+
+class JSONEncoding(Encoding):
+    """
+    JSON by the standard json module, or by orjson or ujson if fast and installed. Returns text, like the original
+    GraphQLView.
+    """
+
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+    media_types = (JSON_CONTENT_TYPE,)
+
+    def __init__(self, fast=False):
+        self.dumps = None
+        if fast:
+            self.dumps = self.get_fast_dumps()
+        if self.dumps is None:
+            self.dumps = lambda d: json.dumps(d, separators=(",", ":"))
+
+    @staticmethod
+    def get_fast_dumps():
+        try:
+            import orjson
+            return lambda d: orjson.dumps(d, default=str).decode("utf-8")
+        except ImportError:
+            pass
+        try:
+            import ujson
+            return lambda d: ujson.dumps(d, ensure_ascii=False)
+        except ImportError:
+            pass
+        return None
+
+    def encode(self, d):
+        return self.dumps(d)
+
+    def join(self, items):
+        return "[{}]".format(",".join(items))
+
+
+class MessagePackEncoding(Encoding):
+    name = "msgpack"
+    content_type = "application/msgpack"
+    media_types = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+    def __init__(self):
+        self.msgpack = import_optional("msgpack", "MessagePack encoding")
+
+    def encode(self, d):
+        return self.msgpack.packb(d, use_bin_type=True, default=str)
+
+    def join(self, items):
+        packer = self.msgpack.Packer(use_bin_type=True)
+        return packer.pack_array_header(len(items)) + b"".join(items)
+
+
+class CBOREncoding(Encoding):
+    name = "cbor"
+    content_type = "application/cbor"
+    media_types = ("application/cbor",)
+
+    def __init__(self):
+        self.cbor2 = import_optional("cbor2", "CBOR encoding")
+
+    def encode(self, d):
+        return self.cbor2.dumps(d, default=lambda encoder, value: encoder.encode(str(value)))
+
+    def join(self, items):
+        # an indefinite-length array
+        return b"\x9f" + b"".join(items) + b"\xff"
+
+
+binary_encoding_classes = {
+    MessagePackEncoding.name: MessagePackEncoding,
+    CBOREncoding.name: CBOREncoding,
+}
+
+
+def create_encodings(fast_json=False, binary_encodings=()):
+    """
+    Returns a dict of encodings by their names, JSON and the given binary ones.
+    """
+    encodings = {JSONEncoding.name: JSONEncoding(fast=fast_json)}
+    for name in binary_encodings:
+        if name not in binary_encoding_classes:
+            raise ValueError("Unknown encoding: {}.".format(name))
+        encodings[name] = binary_encoding_classes[name]()
+    return encodings
+
+
+def _accept_ranges(header):
+    """
+    Yields (quality, index, media type) of each range of an Accept (or Accept-Encoding) header.
+    """
+    for index, item in enumerate(header.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            match = re.match(r"q\s*=\s*([0-9.]+)$", param)
+            if match:
+                try:
+                    quality = float(match.group(1))
+                except ValueError:
+                    quality = 0.0
+        yield quality, index, parts[0].lower()
+
+
+def parse_accept(header):
+    """
+    Returns media types of an Accept (or Accept-Encoding) header, the most preferred first. Excluded ones (q=0) are
+    left out.
+    """
+    ranges = [(-quality, index, media_type) for quality, index, media_type in _accept_ranges(header) if quality > 0]
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+
+def parse_excluded(header):
+    """
+    Returns media types excluded (q=0) by an Accept (or Accept-Encoding) header.
+    """
+    return {media_type for quality, _, media_type in _accept_ranges(header) if quality <= 0}
+
+
+def negotiate_encoding(accept, encodings):
+    """
+    Returns the encoding preferred by the Accept header. JSON unless a binary encoding is preferred explicitly.
+    """
+    json_encoding = encodings[JSONEncoding.name]
+    if len(encodings) == 1:
+        return json_encoding
+
+    for media_type in parse_accept(accept):
+        if media_type in json_encoding.media_types:
+            return json_encoding
+        for encoding in encodings.values():
+            if media_type in encoding.media_types:
+                return encoding
+    return json_encoding
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        # wbits=31 writes the gzip header and trailer
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        brotli = import_optional("brotli", "Brotli compression")
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+compressor_classes = {
+    "br": BrotliCompressor,
+    "gzip": GzipCompressor,
+}
+
+default_compression_levels = {
+    "br": 4,
+    "gzip": 6,
+}
+
+
+def check_compression(compression):
+    """
+    Checks the content codings of the compression, the preferred first.
+    """
+    for coding in compression:
+        if coding not in compressor_classes:
+            raise ValueError("Unknown compression: {}.".format(coding))
+        if coding == "br":
+            import_optional("brotli", "Brotli compression")
+
+
+def negotiate_compression(accept_encoding, compression):
+    """
+    Returns the content coding of compression accepted by the Accept-Encoding header, or None.
+    """
+    accepted = parse_accept(accept_encoding)
+    excluded = parse_excluded(accept_encoding)
+    for coding in compression:
+        # codings excluded explicitly are not accepted by "*"
+        if coding in accepted or ("*" in accepted and coding not in excluded):
+            return coding
+    return None
+
+
+def compress_stream(chunks, compressor):
+    """
+    Compresses a stream chunk by chunk, flushing after each of them so that parts of an incremental response are not
+    held back.
+    """
+    for chunk in chunks:
+        data = compressor.compress(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        data += compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(request, response, compression, min_size=1024):
+    """
+    Compresses the response by a content coding of compression accepted by the request. Streaming responses are
+    compressed as they are streamed, others only if they have at least min_size bytes.
+    """
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if response.has_header("Content-Encoding"):
+        return response
+    if not response.streaming and len(response.content) < min_size:
+        return response
+
+    coding = negotiate_compression(request.META.get("HTTP_ACCEPT_ENCODING", ""), compression)
+    if coding is None:
+        return response
+
+    compressor = compressor_classes[coding](default_compression_levels[coding])
+    if response.streaming:
+        response.streaming_content = compress_stream(response.streaming_content, compressor)
+        if response.has_header("Content-Length"):
+            del response["Content-Length"]
+    else:
+        content = compressor.compress(response.content) + compressor.finish()
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response["Content-Length"] = str(len(content))
+    response["Content-Encoding"] = coding
+    return response
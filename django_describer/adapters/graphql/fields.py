@@ -1,9 +1,21 @@
 import graphene
+from django.db.models import Count, Sum, Avg, Min, Max, Prefetch
 from graphene import Argument, ID
+from graphene.utils.str_converters import to_camel_case
+from graphene_django.filter.utils import get_filtering_args_from_filterset
 from graphene_django.utils import maybe_queryset, is_valid_django_model
 from graphene_django_extras import DjangoFilterListField, DjangoListObjectField, DjangoObjectField
 from graphene_django_extras.base_types import DjangoListObjectBase
+from graphene_django_extras.filters.filter import get_filterset_class
 from graphene_django_extras.utils import queryset_factory, get_extra_filters
+from graphql.language.ast import FragmentSpread, InlineFragment
+
+from .filters import FilterApplier
+from ...changes import get_changes
+from ...describers import get_describer
+from ...entities import load_entity
+from ...search import search_queryset
+from ...utils import model_singular_name
 
 
 class OrderingMixin:
@@ -13,29 +25,32 @@ class OrderingMixin:
     Usage:
 
     query{
-      books(ordering: "name"){
+      books(ordering: [name_ASC]){
         id
         name
       }
 
-      books(ordering: "name,-id"){
+      books(ordering: [name_ASC, id_DESC]){
         id
         name
       }
     }
     """
 
-    def __init__(self, *args, **kwargs):
-        kwargs["args"] = {"ordering": Argument(graphene.String,
-                                               description="String of comma-sepratated fields to order by.")}
+    def __init__(self, *args, ordering=None, **kwargs):
+        """
+        ordering: an Ordering the list can be ordered by, None for no ordering argument.
+        """
+        if ordering is not None:
+            kwargs.setdefault("args", {})
+            kwargs["args"]["ordering"] = ordering.argument()
         super().__init__(*args, **kwargs)
+        self.ordering = ordering
 
-    @staticmethod
-    def list_resolver(*args, **kwargs):
+    def list_resolver(self, *args, **kwargs):
         qs = DjangoFilterListField.list_resolver(*args, **kwargs)
-        if "ordering" in kwargs:
-            ordering_fields = [field.strip() for field in kwargs["ordering"].split(",")]
-            qs = qs.order_by(*ordering_fields)
+        if kwargs.get("ordering"):
+            qs = self.ordering.order_queryset(qs, kwargs["ordering"])
         return qs
 
 
@@ -68,34 +83,165 @@ class PermissionsCheckMixin:
         return output
 
 
+def prefetch_attr(field_name):
+    return "_prefetched_{}".format(field_name)
+
+
+def annotation_attr(field_name):
+    return "_annotated_{}".format(field_name)
+
+
+def get_annotations(model, selected):
+    """
+    Returns annotations computing the selected extra fields of the model which are declared by an expression.
+    """
+    describer = get_describer(model)
+    if describer is None:
+        return {}
+
+    annotations = {}
+    for name, return_type in describer.get_extra_fields().items():
+        if getattr(return_type, "expression", None) is not None and to_camel_case(name) in selected:
+            annotations[annotation_attr(name)] = return_type.expression
+    return annotations
+
+
+def get_selected_names(selection_set, fragments):
+    return {field.name.value for field in get_selected_fields(selection_set, fragments)}
+
+
+def get_selected_fields(selection_set, fragments):
+    """
+    Returns Field nodes of a selection set, including the ones in fragments.
+    """
+    if selection_set is None:
+        return []
+
+    fields = []
+    for selection in selection_set.selections:
+        if isinstance(selection, FragmentSpread):
+            fields.extend(get_selected_fields(fragments[selection.name.value].selection_set, fragments))
+        elif isinstance(selection, InlineFragment):
+            fields.extend(get_selected_fields(selection.selection_set, fragments))
+        else:
+            fields.append(selection)
+    return fields
+
+
 class DjangoNestableListObjectField(DjangoListObjectField):
     """
     Similar to DjangoListObjectField, except it can be nested into ManyToOneRel.
     Also, it can fetch queryset by property.
     """
 
-    def __init__(self, _type, *args, fetch_fn=None, property_name=None, **kwargs):
+    def __init__(self, _type, *args, fetch_fn=None, property_name=None, via=None, via_filter=None, search_fields=(),
+                 search_config=None, counter_field=None, **kwargs):
+        if search_fields:
+            kwargs.setdefault("args", {})
+            kwargs["args"]["search"] = Argument(graphene.String, description="Full-text search query.")
+
         super().__init__(_type, *args, **kwargs)
         self.property_name = property_name
+        self.via = via
+        self.via_filter = via_filter
         self.fetch_fn = fetch_fn
+        self.search_fields = search_fields
+        self.search_config = search_config
+        self.counter_field = counter_field
+        self.filter_applier = FilterApplier(self.filterset_class)
+
+    def get_related_queryset(self, root):
+        qs = getattr(root, self.via).all()
+        if self.via_filter is not None:
+            qs = qs.filter(self.via_filter)
+        return qs
+
+    def get_selected_result_fields(self, selection_set, fragments):
+        """
+        Returns Field nodes selected in the results of a list.
+        """
+        fields = []
+        for field in get_selected_fields(selection_set, fragments):
+            if field.name.value == self.type._meta.results_field_name:
+                fields.extend(get_selected_fields(field.selection_set, fragments))
+        return fields
+
+    def get_prefetches(self, result_fields, fragments):
+        """
+        Returns Prefetch objects for the selected extra fields of the results which are declared by a relation. The
+        prefetched objects are annotated by the extra fields selected in them.
+        """
+        describer = get_describer(self.type._meta.model)
+        if describer is None:
+            return []
+
+        prefetches = []
+        for name, return_type in describer.get_extra_fields().items():
+            nested = [field for field in result_fields if field.name.value == to_camel_case(name)]
+            if getattr(return_type, "via", None) is None or not nested:
+                continue
+            qs = return_type.of_type._default_manager.all()
+            if return_type.filter is not None:
+                qs = qs.filter(return_type.filter)
+
+            nested_selected = set()
+            for field in nested:
+                nested_selected |= {result_field.name.value for result_field in
+                                    self.get_selected_result_fields(field.selection_set, fragments)}
+            annotations = get_annotations(return_type.of_type, nested_selected)
+            if annotations:
+                qs = qs.annotate(**annotations)
+
+            prefetches.append(Prefetch(return_type.via, queryset=qs, to_attr=prefetch_attr(name)))
+        return prefetches
 
     def list_resolver(self, manager, filterset_class, filtering_args, root, info, **kwargs):
+        filter_kwargs = {k: v for k, v in kwargs.items() if k in filtering_args}
+        is_nested = root and is_valid_django_model(root._meta.model)
+
         if self.fetch_fn is not None:
             qs = self.fetch_fn(info.context)
-        elif self.property_name is not None and root and is_valid_django_model(root._meta.model):
+        elif self.property_name is not None and is_nested and self.via is not None:
+            # use the prefetched objects unless they need to be filtered
+            prefetched = getattr(root, prefetch_attr(self.property_name), None)
+            if prefetched is not None and not filter_kwargs and not kwargs.get("search"):
+                return DjangoListObjectBase(
+                    count=len(prefetched),
+                    results=prefetched,
+                    results_field_name=self.type._meta.results_field_name,
+                )
+            qs = self.get_related_queryset(root)
+        elif self.property_name is not None and is_nested:
             qs = getattr(root, self.property_name)
         else:
             qs = queryset_factory(manager, info.field_asts, info.fragments, **kwargs)
 
-        filter_kwargs = {k: v for k, v in kwargs.items() if k in filtering_args}
+        qs = self.filter_applier.apply(qs, filter_kwargs, request=info.context)
 
-        qs = filterset_class(data=filter_kwargs, queryset=qs, request=info.context).qs
+        if self.search_fields and kwargs.get("search"):
+            qs = search_queryset(qs, self.search_fields, kwargs["search"], config=self.search_config)
 
-        if root and is_valid_django_model(root._meta.model):
+        if is_nested:
             extra_filters = get_extra_filters(root, manager.model)
             qs = qs.filter(**extra_filters)
 
-        count = qs.count()
+        result_fields = self.get_selected_result_fields(info.field_asts[0].selection_set, info.fragments)
+        selected = {field.name.value for field in result_fields}
+
+        prefetches = self.get_prefetches(result_fields, info.fragments)
+        if prefetches:
+            qs = qs.prefetch_related(*prefetches)
+
+        # the parent keeps the count of all related objects
+        if is_nested and self.counter_field is not None and not filter_kwargs and not kwargs.get("search"):
+            count = getattr(root, self.counter_field)
+        else:
+            count = qs.count()
+
+        # annotated after counting, so that the count query stays cheap
+        annotations = get_annotations(self.type._meta.model, selected)
+        if annotations:
+            qs = qs.annotate(**annotations)
         results = maybe_queryset(qs)
 
         return DjangoListObjectBase(
@@ -116,12 +262,135 @@ class DjangoCustomObjectField(DjangoObjectField):
         super(DjangoObjectField, self).__init__(_type, *args, **kwargs)
 
     def object_resolver(self, manager, root, info, **kwargs):
+        pk = kwargs.get("id", None)
         if self.fetch_fn is not None:
-            pk = kwargs.get("id", None)
             if pk is not None:
                 pk = int(pk)
             return self.fetch_fn(info.context, pk)
-        return super().object_resolver(manager, root, info, **kwargs)
+
+        # objects loaded earlier in the request, or cached, are not fetched again unless they need annotations
+        model = manager.model
+        annotations = get_annotations(model, get_selected_names(info.field_asts[0].selection_set, info.fragments))
+        if annotations:
+            obj = manager.get_queryset().annotate(**annotations).filter(pk=pk).first()
+        else:
+            obj = load_entity(info.context, model, pk)
+        if obj is None:
+            raise ValueError("`{}` with pk={} does not exist.".format(model_singular_name(model), pk))
+        return obj
+
+
+aggregate_functions = {
+    "sum": Sum,
+    "avg": Avg,
+    "min": Min,
+    "max": Max,
+}
+
+
+class DjangoAggregateField(graphene.Field):
+    """
+    Aggregates a filtered queryset in a single values().annotate() query. Returns one row per group.
+    """
+
+    def __init__(self, _type, model_type, *args, fetch_fn=None, fields=(), group_by=(), group_by_enum=None, **kwargs):
+        self.filterset_class = get_filterset_class(
+            model_type._meta.filterset_class, model=model_type._meta.model, fields=model_type._meta.filter_fields)
+        self.filtering_args = get_filtering_args_from_filterset(self.filterset_class, model_type)
+        self.filter_applier = FilterApplier(self.filterset_class)
+
+        kwargs.setdefault("args", {})
+        kwargs["args"].update(self.filtering_args)
+        if group_by_enum is not None:
+            kwargs["args"]["group_by"] = Argument(graphene.List(graphene.NonNull(group_by_enum)),
+                                                  description="Fields to group the results by.")
+
+        self.model = model_type._meta.model
+        self.fetch_fn = fetch_fn
+        self.fields = fields
+        self.group_by = group_by
+        super().__init__(graphene.List(_type), *args, **kwargs)
+
+    def get_annotations(self):
+        annotations = {"aggregate_count": Count("pk")}
+        for function_name, function in aggregate_functions.items():
+            for field in self.fields:
+                annotations["aggregate_{}_{}".format(function_name, field)] = function(field)
+        return annotations
+
+    def build_row(self, values, group_by):
+        row = {"count": values["aggregate_count"]}
+        for field in group_by:
+            row[field] = values[field]
+        for function_name in aggregate_functions:
+            row[function_name] = {
+                field: values["aggregate_{}_{}".format(function_name, field)] for field in self.fields
+            }
+        return row
+
+    def aggregate_resolver(self, root, info, **kwargs):
+        if self.fetch_fn is not None:
+            qs = self.fetch_fn(info.context)
+        else:
+            qs = self.model._default_manager.all()
+
+        filter_kwargs = {k: v for k, v in kwargs.items() if k in self.filtering_args}
+        qs = self.filter_applier.apply(qs, filter_kwargs, request=info.context)
+
+        if hasattr(self, "permission_check_method"):
+            self.permission_check_method(root, info, qs, **kwargs)
+
+        group_by = kwargs.get("group_by") or ()
+        for field in group_by:
+            if field not in self.group_by:
+                raise ValueError("Cannot group by `{}`.".format(field))
+
+        if not group_by:
+            return [self.build_row(qs.aggregate(**self.get_annotations()), group_by)]
+
+        rows = qs.order_by().values(*group_by).annotate(**self.get_annotations()).order_by(*group_by)
+        return [self.build_row(values, group_by) for values in rows]
+
+    def get_resolver(self, parent_resolver):
+        return self.aggregate_resolver
+
+
+class DjangoChangesField(graphene.Field):
+    """
+    Reads ids of objects changed since a cursor from the change log. Cursors are opaque strings.
+    """
+
+    def __init__(self, _type, model, *args, page_size=1000, settle_time=10, **kwargs):
+        kwargs.setdefault("args", {})
+        kwargs["args"]["since"] = Argument(
+            graphene.String, description="Cursor returned by the previous call, omit to read all changes.")
+        kwargs["args"]["limit"] = Argument(graphene.Int, description="Maximum number of log entries to read.")
+
+        self.model = model
+        self.page_size = page_size
+        self.settle_time = settle_time
+        super().__init__(_type, *args, **kwargs)
+
+    def changes_resolver(self, root, info, **kwargs):
+        if hasattr(self, "permission_check_method"):
+            self.permission_check_method(root, info, **kwargs)
+
+        limit = min(kwargs.get("limit") or self.page_size, self.page_size)
+        if limit < 1:
+            raise ValueError("Limit has to be positive.")
+
+        created, updated, deleted, cursor, has_more = get_changes(self.model, since=kwargs.get("since"), limit=limit,
+                                                                  settle_time=self.settle_time)
+        return {
+            "created": created,
+            "updated": updated,
+            "deleted": deleted,
+            "cursor": cursor,
+            "has_more": has_more,
+        }
+
+    def get_resolver(self, parent_resolver):
+        return self.changes_resolver
 
 
 class DjangoObjectPermissionsField(PermissionsCheckMixin, DjangoCustomObjectField):
@@ -130,3 +399,11 @@ class DjangoObjectPermissionsField(PermissionsCheckMixin, DjangoCustomObjectFiel
 
 class DjangoNestableListObjectPermissionsField(PermissionsCheckMixin, DjangoNestableListObjectField):
     pass
+
+
+class DjangoAggregatePermissionsField(PermissionsCheckMixin, DjangoAggregateField):
+    pass
+
+
+class DjangoChangesPermissionsField(PermissionsCheckMixin, DjangoChangesField):
+    pass
@@ -0,0 +1,63 @@
+from django.core.exceptions import ValidationError
+from django.db.models import ForeignKey
+from django_filters import CharFilter, NumberFilter, BooleanFilter, ModelChoiceFilter
+from django_filters.constants import EMPTY_VALUES
+
+
+def _strip(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _identity(value):
+    return value
+
+
+class FilterApplier:
+    """
+    Applies filter arguments to a queryset. Simple filters are precomputed into ORM lookups and validation callables
+    once, at schema generation time, so typed GraphQL arguments do not need to go through the forms of django-filter.
+    Any other filter falls back to the filterset.
+    """
+
+    def __init__(self, filterset_class):
+        self.filterset_class = filterset_class
+        self.lookups = {}  # key: argument name, value: (ORM lookup, validation callable)
+
+        model = filterset_class._meta.model
+        for name, f in filterset_class.base_filters.items():
+            if f.method is not None or f.exclude or f.distinct:
+                continue
+
+            lookup = "{}__{}".format(f.field_name, f.lookup_expr)
+
+            if type(f) is CharFilter:
+                self.lookups[name] = (lookup, _strip)
+            elif type(f) in (NumberFilter, BooleanFilter):
+                self.lookups[name] = (lookup, _identity)
+            elif type(f) is ModelChoiceFilter and f.lookup_expr == "exact":
+                # compare the raw key instead of fetching the object in the form
+                field = model._meta.get_field(f.field_name)
+                if isinstance(field, ForeignKey) and \
+                        f.extra.get("to_field_name") in (None, field.target_field.name):
+                    self.lookups[name] = ("{}__exact".format(field.attname), field.target_field.to_python)
+
+    def apply(self, qs, filter_kwargs, request=None):
+        if not filter_kwargs:
+            return qs
+
+        lookups = {}
+        for name, value in filter_kwargs.items():
+            if name not in self.lookups:
+                return self.filterset_class(data=filter_kwargs, queryset=qs, request=request).qs
+
+            lookup, clean = self.lookups[name]
+            try:
+                value = clean(value)
+            except ValidationError:
+                # let the filterset deal with invalid values
+                return self.filterset_class(data=filter_kwargs, queryset=qs, request=request).qs
+
+            if value not in EMPTY_VALUES:
+                lookups[lookup] = value
+
+        return qs.filter(**lookups)
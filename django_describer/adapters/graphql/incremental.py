@@ -0,0 +1,317 @@
+from graphql import parse, validate, GraphQLError
+from graphql.execution.values import get_argument_values
+from graphql.language import ast
+from graphql.language.printer import print_ast
+from graphql.type import GraphQLArgument, GraphQLBoolean, GraphQLInt, GraphQLString
+from graphql.type.definition import get_named_type
+from graphql.type.directives import GraphQLDirective, DirectiveLocation, GraphQLIncludeDirective, \
+    GraphQLSkipDirective
+from graphql.utils.get_operation_ast import get_operation_ast
+
+
+MULTIPART_CONTENT_TYPE = 'multipart/mixed; boundary="-"; deferSpec=20220824'
+
+# response key of a placeholder for selection sets deferred entirely, removed from the initial data
+PLACEHOLDER_KEY = "_deferred"
+
+GraphQLDeferDirective = GraphQLDirective(
+    name="defer",
+    description="Delivers the fragment after the rest of the response.",
+    args={
+        "if": GraphQLArgument(GraphQLBoolean, default_value=True),
+        "label": GraphQLArgument(GraphQLString),
+    },
+    locations=[DirectiveLocation.FRAGMENT_SPREAD, DirectiveLocation.INLINE_FRAGMENT],
+)
+
+GraphQLStreamDirective = GraphQLDirective(
+    name="stream",
+    description="Delivers initialCount items of a paginated list with the response, and the rest of them later.",
+    args={
+        "if": GraphQLArgument(GraphQLBoolean, default_value=True),
+        "label": GraphQLArgument(GraphQLString),
+        "initialCount": GraphQLArgument(GraphQLInt, default_value=0),
+    },
+    locations=[DirectiveLocation.FIELD],
+)
+
+directives = [GraphQLIncludeDirective, GraphQLSkipDirective, GraphQLDeferDirective, GraphQLStreamDirective]
+
+
+class Part:
+    """
+    A deferred fragment or the rest of a streamed list, fetched by a separate query. path consists of response keys
+    leading to the object of the fragment, or to the list. Lists on the way are fanned out once the part is executed.
+    """
+
+    def __init__(self, kind, path, label, query, start=0):
+        self.kind = kind
+        self.path = path
+        self.label = label
+        self.query = query
+        self.start = start
+
+    def get_entries(self, data):
+        """
+        Returns entries of the incremental payload for the data of the executed query.
+        """
+        entries = []
+        for path, value in walk(data, self.path, fan_out=self.kind == "defer"):
+            if self.kind == "defer":
+                entry = {"data": value, "path": path}
+            else:
+                entry = {"items": value, "path": path + [self.start]}
+            if self.label is not None:
+                entry["label"] = self.label
+            entries.append(entry)
+        return entries
+
+
+class Plan:
+    """
+    The initial query and the parts of an operation with deferred fragments or streamed lists.
+    """
+
+    def __init__(self, query, parts, empty_lists, placeholders):
+        self.query = query
+        self.parts = parts
+        self.empty_lists = empty_lists  # paths of streamed lists with no initial items
+        self.placeholders = placeholders  # paths of selection sets deferred entirely
+
+    def complete_initial_data(self, data):
+        for path in self.empty_lists:
+            for _, obj in walk(data, path[:-1]):
+                obj[path[-1]] = []
+        for path in self.placeholders:
+            for _, obj in walk(data, path):
+                obj.pop(PLACEHOLDER_KEY, None)
+        return data
+
+
+def walk(value, keys, concrete_path=(), fan_out=True):
+    """
+    Yields (path, value) of values at the keys, fanning out lists on the way (and at the end if fan_out).
+    """
+    if value is None:
+        return
+    if isinstance(value, list) and (keys or fan_out):
+        for index, item in enumerate(value):
+            yield from walk(item, keys, list(concrete_path) + [index], fan_out)
+    elif not keys:
+        yield list(concrete_path), value
+    elif isinstance(value, dict):
+        yield from walk(value.get(keys[0], None), keys[1:], list(concrete_path) + [keys[0]], fan_out)
+
+
+def get_directive_values(node, directive, variables):
+    """
+    Returns the arguments of the directive if it applies to the node, None otherwise.
+    """
+    for node_directive in node.directives or ():
+        if node_directive.name.value == directive.name:
+            values = get_argument_values(directive.args, node_directive.arguments, variables)
+            return values if values.get("if", True) else None
+    return None
+
+
+def inline_fragments(selection_set, fragments):
+    """
+    Replaces fragment spreads by inline fragments, so that queries of parts need no fragment definitions.
+    """
+    if selection_set is None:
+        return None
+
+    selections = []
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.FragmentSpread):
+            fragment = fragments[selection.name.value]
+            selections.append(ast.InlineFragment(fragment.type_condition,
+                                                 inline_fragments(fragment.selection_set, fragments),
+                                                 directives=selection.directives))
+        elif isinstance(selection, ast.InlineFragment):
+            selections.append(ast.InlineFragment(selection.type_condition,
+                                                 inline_fragments(selection.selection_set, fragments),
+                                                 directives=selection.directives))
+        else:
+            selections.append(copy_field(selection, selection_set=inline_fragments(selection.selection_set,
+                                                                                     fragments)))
+    return ast.SelectionSet(selections)
+
+
+def copy_field(field, **kwargs):
+    attrs = {
+        "name": field.name,
+        "alias": field.alias,
+        "arguments": field.arguments,
+        "directives": field.directives,
+        "selection_set": field.selection_set,
+    }
+    attrs.update(kwargs)
+    return ast.Field(**attrs)
+
+
+def set_int_arguments(arguments, **values):
+    """
+    Returns the arguments with the given ones replaced by integer literals, or removed if None.
+    """
+    ret = [argument for argument in arguments or () if argument.name.value not in values]
+    for name, value in values.items():
+        if value is not None:
+            ret.append(ast.Argument(ast.Name(name), ast.IntValue(str(value))))
+    return ret
+
+
+def wrap(ancestors, selection):
+    """
+    Nests the selection into copies of the ancestors, the outermost first.
+    """
+    for ancestor in reversed(ancestors):
+        if isinstance(ancestor, ast.InlineFragment):
+            selection = ast.InlineFragment(ancestor.type_condition, ast.SelectionSet([selection]),
+                                           directives=ancestor.directives)
+        else:
+            selection = copy_field(ancestor, selection_set=ast.SelectionSet([selection]))
+    return ast.SelectionSet([selection])
+
+
+class Splitter:
+    """
+    Splits a selection set into the initial one and parts, keeping the ancestors of each part.
+    """
+
+    def __init__(self, schema, variables):
+        self.schema = schema
+        self.variables = variables or {}
+        self.parts = []  # list of (kind, path, label, selection set, start)
+        self.empty_lists = []
+        self.placeholders = []
+
+    def split(self, parent_type, selection_set, path=(), ancestors=()):
+        selections = []
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.InlineFragment):
+                selections.extend(self.split_fragment(parent_type, selection, path, ancestors))
+            else:
+                selections.append(self.split_field(parent_type, selection, path, ancestors))
+
+        # the rest of the selection set may have been deferred
+        if not selections:
+            selections.append(ast.Field(ast.Name("__typename"), alias=ast.Name(PLACEHOLDER_KEY)))
+            self.placeholders.append(list(path))
+        return ast.SelectionSet(selections)
+
+    def split_fragment(self, parent_type, fragment, path, ancestors):
+        defer = get_directive_values(fragment, GraphQLDeferDirective, self.variables)
+        if defer is not None:
+            self.parts.append(("defer", list(path), defer.get("label", None), wrap(ancestors, fragment), 0))
+            return []
+
+        fragment_type = parent_type
+        if fragment.type_condition is not None:
+            fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+        return [ast.InlineFragment(
+            fragment.type_condition,
+            self.split(fragment_type, fragment.selection_set, path, list(ancestors) + [fragment]),
+            directives=fragment.directives,
+        )]
+
+    def split_field(self, parent_type, field, path, ancestors):
+        if field.selection_set is None:
+            return field
+
+        key = (field.alias or field.name).value
+        field_def = parent_type.fields[field.name.value]
+        field_path = list(path) + [key]
+
+        def split_selection_set(returned_field=field):
+            # parts nested in the field are fetched through the field as it is returned, e. g. with a limit
+            return self.split(get_named_type(field_def.type), field.selection_set, field_path,
+                              list(ancestors) + [returned_field])
+
+        stream = get_directive_values(field, GraphQLStreamDirective, self.variables)
+        # only paginated lists can be streamed, others are delivered at once
+        if stream is None or "limit" not in field_def.args or "offset" not in field_def.args:
+            return copy_field(field, selection_set=split_selection_set())
+
+        initial_count = max(stream["initialCount"], 0)
+        arguments = get_argument_values(field_def.args, field.arguments, self.variables)
+        limit = arguments.get("limit", None)
+        offset = arguments.get("offset", None) or 0
+
+        if limit is not None and limit <= initial_count:
+            return copy_field(field, selection_set=split_selection_set())
+
+        rest = copy_field(field, arguments=set_int_arguments(
+            field.arguments, offset=offset + initial_count, limit=None if limit is None else limit - initial_count))
+        self.parts.append(("stream", field_path, stream.get("label", None), wrap(ancestors, rest), initial_count))
+
+        if initial_count == 0:
+            # a placeholder replaced by an empty list, there is no limit of 0
+            self.empty_lists.append(field_path)
+            return ast.Field(ast.Name("__typename"), alias=ast.Name(key))
+        initial_field = copy_field(field, arguments=set_int_arguments(field.arguments, limit=initial_count))
+        return copy_field(initial_field, selection_set=split_selection_set(initial_field))
+
+
+def get_used_variables(node, used=None):
+    used = set() if used is None else used
+    if isinstance(node, ast.Variable):
+        used.add(node.name.value)
+    elif isinstance(node, list):
+        for item in node:
+            get_used_variables(item, used)
+    elif isinstance(node, ast.Node):
+        for name in node._fields:
+            get_used_variables(getattr(node, name), used)
+    return used
+
+
+def print_operation(operation, selection_set):
+    """
+    Prints a query of the selection set, with the variables of the operation it uses.
+    """
+    used = get_used_variables(selection_set)
+    return print_ast(ast.Document([ast.OperationDefinition(
+        operation="query",
+        selection_set=selection_set,
+        name=operation.name,
+        variable_definitions=[definition for definition in operation.variable_definitions or ()
+                              if definition.variable.name.value in used],
+        directives=operation.directives,
+    )]))
+
+
+def plan_incremental_delivery(schema, query, operation_name, variables):
+    """
+    Returns the Plan of a query operation deferring or streaming anything, None otherwise. Invalid documents are left
+    to the regular execution, which reports the errors.
+    """
+    if "@defer" not in query and "@stream" not in query:
+        return None
+
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    if validate(schema, document):
+        return None
+
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation != "query":
+        return None
+
+    fragments = {definition.name.value: definition for definition in document.definitions
+                 if isinstance(definition, ast.FragmentDefinition)}
+
+    splitter = Splitter(schema, variables)
+    try:
+        initial = splitter.split(schema.get_query_type(), inline_fragments(operation.selection_set, fragments))
+    except GraphQLError:
+        # invalid variables
+        return None
+    if not splitter.parts:
+        return None
+
+    parts = [Part(kind, path, label, print_operation(operation, selection_set), start)
+             for kind, path, label, selection_set, start in splitter.parts]
+    return Plan(print_operation(operation, initial), parts, splitter.empty_lists, splitter.placeholders)
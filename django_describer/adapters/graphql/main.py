@@ -3,22 +3,79 @@ import logging
 import graphene
 from django.views.decorators.csrf import csrf_exempt
 from graphene.types.utils import get_field_as
-from graphene_django.views import GraphQLView
 
 from django_describer.adapters.utils import non_model_actions
 from ..base import Adapter
-from .fields import DjangoNestableListObjectPermissionsField, DjangoObjectPermissionsField
+from .fields import DjangoNestableListObjectPermissionsField, DjangoObjectPermissionsField, \
+    DjangoAggregatePermissionsField, DjangoChangesPermissionsField
 from ...datatypes import get_instantiated_type
 from ...describers import get_describers
+from ...jobs import JobRunner
 from ...utils import AttrDict, in_kwargs_and_true
 from .retrieving import create_type_class, add_extra_fields_to_type_class, add_permissions_to_type_class, \
-    create_query_class, create_global_query_class
+    create_query_class, create_global_query_class, create_aggregate_type_class, create_ordering_fields, \
+    report_unindexed_exposures, create_changes_type_class, add_entity_resolvers_to_type_class, \
+    create_job_type_class, create_job_query_class, determine_aggregate_fields
 from .modifying import create_mutation_classes, create_global_mutation_class
+from .views import DescriberGraphQLView
+from .coalescing import SingleFlight
+from .incremental import directives as incremental_directives
+from .encoding import create_encodings, check_compression
 
 create_class = type
 
 
 class GraphQL(Adapter):
+    def __init__(self, atomic_mutations=False, fail_fast=False, coalesce_queries=False, coalesce_ttl=0,
+                 coalesce_key=None, roles=None, role_key=None, batching=False, batch_max_size=None, batch_workers=None,
+                 profiler=None, slow_query_log=None, incremental_delivery=False, job_workers=2, job_timeout=3600,
+                 fast_json=False, binary_encodings=(), compression=(), compression_min_size=1024):
+        """
+        atomic_mutations: run all mutation fields of an operation in one transaction, each of them in a savepoint.
+        fail_fast: with atomic_mutations, stop at the first failing mutation field and roll back the whole operation.
+        coalesce_queries: execute identical concurrent query operations only once and share the result.
+        coalesce_ttl: seconds to keep sharing the result of a coalesced operation after it has finished.
+        coalesce_key: function of the request returning a key, only operations with equal keys share results.
+            Defaults to the user's pk, anonymous requests share a single key.
+        roles: role keys to build a pruned schema for, without the fields and actions denied to the role.
+        role_key: function of the request returning its role key, requests of other roles use the full schema.
+        batching: accept a JSON array of operations in one POST and return an array of results.
+        batch_max_size: the maximum number of operations in a batch, None for no limit.
+        batch_workers: execute batches of queries in this many threads, None to execute them one by one.
+        profiler: a Profiler of a sample of executed operations.
+        slow_query_log: a SlowQueryLog of operations exceeding its threshold.
+        incremental_delivery: support @defer and @stream, delivered as multipart responses.
+        job_workers: threads running jobs of actions with async_exec in the web process, 0 to leave them to the
+            run_jobs command.
+        job_timeout: seconds after which running jobs are considered dead and failed.
+        fast_json: serialize JSON by orjson or ujson, whichever is installed.
+        binary_encodings: "msgpack" and/or "cbor", sent to clients preferring them by the Accept header.
+        compression: content codings, "br" and/or "gzip", the preferred first.
+        compression_min_size: responses shorter than this many bytes are not compressed, except streaming ones.
+        """
+        self.atomic_mutations = atomic_mutations
+        self.fail_fast = fail_fast
+        self.coalesce_queries = coalesce_queries
+        self.coalesce_ttl = coalesce_ttl
+        self.coalesce_key = coalesce_key
+        self.roles = roles
+        self.role_key = role_key
+        self.role = None
+        self.batching = batching
+        self.batch_max_size = batch_max_size
+        self.batch_workers = batch_workers
+        self.profiler = profiler
+        self.slow_query_log = slow_query_log
+        self.incremental_delivery = incremental_delivery
+        self.job_workers = job_workers
+        self.job_timeout = job_timeout
+        self.job_runner = None
+        self.job_type = None
+        self.encodings = create_encodings(fast_json=fast_json, binary_encodings=binary_encodings)
+        check_compression(compression)
+        self.compression = tuple(compression)
+        self.compression_min_size = compression_min_size
+
     def _convert_primitive_type(self, type, **kwargs):
         """
         A helper for converting primitive types to Graphene.
@@ -47,7 +104,7 @@ class GraphQL(Adapter):
     def queryset_type(self, type, **kwargs):
         """
         Returns a field for listing. If the data shall be fetched from a queryset returned by its property,
-        the property name is passed via kwargs.
+        the property name is passed via kwargs, as well as the name of a field counting the objects, if any.
         """
         if in_kwargs_and_true(kwargs, "input") or in_kwargs_and_true(kwargs, "input_field"):
             raise ValueError("Cannot convert QuerySet as input parameter.")
@@ -56,7 +113,8 @@ class GraphQL(Adapter):
 
         return graphene.Dynamic(lambda: DjangoNestableListObjectPermissionsField(
             type.type.convert(self, list=True),  # listing type is derived from the type passed as the of_type argument
-            property_name=property_name))
+            property_name=property_name, via=type.via, via_filter=type.filter,
+            counter_field=kwargs.get("counter_field", None)))
 
     def model_type(self, type, **kwargs):
         """
@@ -96,12 +154,25 @@ class GraphQL(Adapter):
 
     def list_action(self, action, **kwargs):
         return DjangoNestableListObjectPermissionsField(
-            self.type_classes[action._describer.model].get_list_type(), fetch_fn=action.get_fetch_fn())
+            self.type_classes[action._describer.model].get_list_type(), fetch_fn=action.get_fetch_fn(),
+            search_fields=action._describer.get_search_fields(), search_config=action._describer.search_config)
 
     def detail_action(self, action, **kwargs):
-        return DjangoObjectPermissionsField(self.type_classes[action._describer.model], fetch_fn=action.get_fetch_fn(),
+        # the default fetch is done by the field, which annotates the selected extra fields
+        return DjangoObjectPermissionsField(self.type_classes[action._describer.model], fetch_fn=action.fetch_fn,
                                             id_arg=action.id_arg)
 
+    def aggregate_action(self, action, **kwargs):
+        type_class, group_by_enum = create_aggregate_type_class(self, action)
+        fields, group_by = determine_aggregate_fields(action, self.role)
+        return DjangoAggregatePermissionsField(type_class, self.type_classes[action._describer.model],
+                                               fetch_fn=action.get_fetch_fn(), fields=fields, group_by=group_by,
+                                               group_by_enum=group_by_enum)
+
+    def changes_action(self, action, **kwargs):
+        return DjangoChangesPermissionsField(create_changes_type_class(action), action._describer.model,
+                                             page_size=action.page_size, settle_time=action.settle_time)
+
     def create_action(self, action, **kwargs):
         if in_kwargs_and_true(kwargs, "input_flag"):
             return "create"
@@ -110,6 +181,10 @@ class GraphQL(Adapter):
         if in_kwargs_and_true(kwargs, "input_flag"):
             return "update"
 
+    def upsert_action(self, action, **kwargs):
+        if in_kwargs_and_true(kwargs, "input_flag"):
+            return "create"
+
     def delete_action(self, action, **kwargs):
         if in_kwargs_and_true(kwargs, "input_flag"):
             return "delete"
@@ -118,25 +193,49 @@ class GraphQL(Adapter):
         if in_kwargs_and_true(kwargs, "input_flag"):
             return "update"
 
-    def generate(self):
-        # silence GraphQL exception logger
-        logging.getLogger("graphql.execution.utils").setLevel(logging.CRITICAL)
-
+    def generate_schema(self, role=None):
+        """
+        Creates the graphene Schema from all describers. With a role, permissions depending only on the role are
+        resolved now and fields and actions denied to it are left out.
+        """
         describers = get_describers()
 
+        self.role = role
+        self._action_names = set()
+
         self.type_classes = AttrDict()  # key: Model, value: DjangoObjectType
         self.query_classes = AttrDict()  # key: Model, value: Query
         self.mutation_classes = AttrDict()  # key: Model, value: Mutation
 
         for describer in describers:
+            # all models are loaded by now, so misconfigured counters are reported here rather than by signals
+            describer.get_counters()
+
             # create a DjangoObjectType for the model
-            self.type_classes[describer.model] = create_type_class(describer)
+            self.type_classes[describer.model] = create_type_class(describer, role=role)
 
             # add extra fields to each DjangoObjectType class
             add_extra_fields_to_type_class(self, describer, self.type_classes[describer.model])
 
+            # resolve foreign keys through the entity cache
+            add_entity_resolvers_to_type_class(describer, self.type_classes[describer.model])
+
             # add permissions to each DjangoObjectType class (object fields)
-            add_permissions_to_type_class(describer, self.type_classes[describer.model])
+            add_permissions_to_type_class(describer, self.type_classes[describer.model], role=role)
+
+            # report filters and ordering which cannot use an index, once for all roles
+            if role is None:
+                report_unindexed_exposures(describer, self.type_classes[describer.model]._meta.filter_fields,
+                                           create_ordering_fields(describer))
+
+        # jobs of actions executed in the background
+        extra_query_classes = []
+        if any(action.async_exec for describer in describers for action in describer.get_actions()) or \
+                any(action.async_exec for action in non_model_actions):
+            self.job_type = create_job_type_class()
+            extra_query_classes.append(create_job_query_class(self.job_type))
+            if self.job_workers and self.job_runner is None:
+                self.job_runner = JobRunner(self.job_workers, timeout=self.job_timeout)
 
         for describer in describers:
             # create a Query class for each model (need to create all of them first)
@@ -149,10 +248,36 @@ class GraphQL(Adapter):
         non_model_mutation_classes = create_mutation_classes(self, non_model_actions)
 
         # create GraphQL schema
-        schema = graphene.Schema(
-            query=create_global_query_class(self.query_classes, non_model_query_class),
-            mutation=create_global_mutation_class(self.mutation_classes, non_model_mutation_classes)
+        return graphene.Schema(
+            query=create_global_query_class(self.query_classes, non_model_query_class, extra_query_classes),
+            mutation=create_global_mutation_class(self.mutation_classes, non_model_mutation_classes),
+            directives=incremental_directives if self.incremental_delivery else None,
         )
 
+    def generate(self):
+        # silence GraphQL exception logger
+        logging.getLogger("graphql.execution.utils").setLevel(logging.CRITICAL)
+
+        schema = self.generate_schema()
+        schemas = {role: self.generate_schema(role=role) for role in self.roles or ()}
+
         # create GraphQL view
-        return csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema))
+        return csrf_exempt(DescriberGraphQLView.as_view(
+            graphiql=True,
+            schema=schema,
+            atomic_mutations=self.atomic_mutations,
+            fail_fast=self.fail_fast,
+            coalescer=SingleFlight(ttl=self.coalesce_ttl) if self.coalesce_queries else None,
+            coalesce_key=self.coalesce_key,
+            schemas=schemas,
+            role_key=self.role_key,
+            batching=self.batching,
+            batch_max_size=self.batch_max_size,
+            batch_workers=self.batch_workers,
+            profiler=self.profiler,
+            slow_query_log=self.slow_query_log,
+            incremental_delivery=self.incremental_delivery,
+            encodings=self.encodings,
+            compression=self.compression,
+            compression_min_size=self.compression_min_size,
+        ))
@@ -1,14 +1,20 @@
 from inspect import isclass
 
 import graphene
-from django.db.models import ForeignKey
+from django.db import transaction
 from graphene import ObjectType, InputField, NonNull
 from graphene.types.utils import get_field_as
 from graphene_django_extras import DjangoInputObjectType
 
+from django_describer.actions import UpsertAction
 from django_describer.adapters.utils import register_action_name
 from django_describer.datatypes import get_instantiated_type
-from django_describer.utils import to_camelcase, in_kwargs_and_true, in_kwargs_and_false
+from django_describer.entities import forget_entities
+from django_describer.jobs import enqueue_job
+from django_describer.permissions import specialize_permissions
+from django_describer.utils import to_camelcase, in_kwargs_and_true, in_kwargs_and_false, get_model_meta
+from django_describer.validation import validate_foreign_keys
+from .views import get_mutation_batch
 
 
 def create_mutation_classes(adapter, actions):
@@ -16,29 +22,111 @@ def create_mutation_classes(adapter, actions):
     for action in actions:
         if action.read_only:
             continue
-        mutation_classes.append(create_mutation_class(adapter, action, has_model=action.has_model))
+        # mutations denied to the adapter's role are left out
+        permissions = specialize_permissions(action.get_permissions(), adapter.role)
+        if permissions is None:
+            continue
+        input_class = create_input_class(adapter, action) if action.has_model else None
+        mutation_classes.append(create_mutation_class(adapter, action, has_model=action.has_model,
+                                                      input_class=input_class, permissions=permissions))
+        if action.has_bulk_form:
+            mutation_classes.append(create_mutation_class(adapter, action, input_class=input_class, bulk=True,
+                                                          permissions=permissions))
     return mutation_classes
 
 
-def create_mutate_method(action, has_model=True):
+def create_mutate_method(action, has_model=True, permissions=None, job_runner=None):
     """
-    Creates the mutate method based on fn. Adds permissions as well.
+    Creates the mutate method based on fn. Adds permissions as well, the action's ones unless given. Actions with
+    async_exec are enqueued as jobs, submitted to the job_runner.
     """
+    if permissions is None:
+        permissions = action.get_permissions()
 
-    @classmethod
-    def mutate(cls, root, info, *args, **kwargs):
+    def execute(info, data):
         obj = None
-        if has_model and "id" in kwargs["data"]:
-            obj = action.get_fetch_fn()(info.context, kwargs["data"]["id"])
+        if has_model and "id" in data:
+            obj = action.get_fetch_fn()(info.context, data["id"])
 
-        for permission_class in action.get_permissions():
-            pc = permission_class(info.context, obj=obj, data=kwargs["data"])
+        for permission_class in permissions:
+            pc = permission_class(info.context, obj=obj, data=data)
             if not pc.has_permission():
                 raise PermissionError(pc.error_message())
 
+        # fail before writing anything rather than on an integrity error
+        if has_model:
+            validate_foreign_keys(info.context, action._describer.model, [data],
+                                  permissions=action.foreign_key_permissions)
+
+        # objects loaded earlier in the request would be stale
+        if has_model:
+            forget_entities(info.context, action._describer.model)
+
+        if action.async_exec:
+            return {"job": enqueue_job(info.context, action, data, obj=obj, runner=job_runner)}
+
         if obj is not None:
-            return action.get_exec_fn()(info.context, obj, kwargs["data"])
-        return action.get_exec_fn()(info.context, kwargs["data"])
+            return action.get_exec_fn()(info.context, obj, data)
+        return action.get_exec_fn()(info.context, data)
+
+    @classmethod
+    def mutate(cls, root, info, *args, **kwargs):
+        # run in a savepoint if the whole operation is batched into one transaction
+        batch = get_mutation_batch(info.context)
+        if batch is not None:
+            return batch.run(lambda: execute(info, kwargs["data"]))
+        return execute(info, kwargs["data"])
+
+    return mutate
+
+
+def check_permissions(request, permission_classes, obj=None, data=None):
+    for permission_class in permission_classes:
+        pc = permission_class(request, obj=obj, data=data)
+        if not pc.has_permission():
+            raise PermissionError(pc.error_message())
+
+
+def create_upsert_mutate_method(action, bulk=False, permissions=None):
+    """
+    Creates the mutate method of an upsert, checking all rows before anything is written. The existing objects are
+    locked until the write, so they cannot change between the checks and the write. Objects inserted meanwhile by
+    concurrent transactions are updated with only create_permissions checked.
+    """
+    if permissions is None:
+        permissions = action.get_permissions()
+
+    def execute(info, rows):
+        request = info.context
+        for row in rows:
+            check_permissions(request, permissions, data=row)
+
+        validate_foreign_keys(request, action._describer.model, rows, permissions=action.foreign_key_permissions)
+
+        # the existing objects are needed only to tell the inserted rows from the updated ones
+        if action.create_permissions or action.update_permissions:
+            existing = action.fetch_existing(rows, lock=True)
+            for row in rows:
+                obj = existing.get(action.get_unique_key(row), None)
+                if obj is None:
+                    check_permissions(request, action.create_permissions, data=row)
+                else:
+                    check_permissions(request, action.update_permissions, obj=obj, data=row)
+
+        forget_entities(request, action._describer.model)
+        objects = action.get_exec_fn()(request, rows)
+        if bulk:
+            return {"objects": objects}
+        return {"object": objects[0]}
+
+    @classmethod
+    def mutate(cls, root, info, *args, **kwargs):
+        rows = kwargs["data"] if bulk else [kwargs["data"]]
+        batch = get_mutation_batch(info.context)
+        if batch is not None:
+            return batch.run(lambda: execute(info, rows))
+        with transaction.atomic():
+            return execute(info, rows)
 
     return mutate
 
@@ -53,9 +141,9 @@ def create_return_fields(adapter, action):
 def update_foreign_key_fields(action, input_class):
     updated_fields = {}
     deleted_fields = set()
+    foreign_keys = get_model_meta(action._describer.model).foreign_keys
     for name, field in input_class._meta.fields.items():
-        django_field = action._describer.model._meta.get_field(name)
-        if isinstance(django_field, ForeignKey):
+        if name in foreign_keys:
             updated_fields["{}_id".format(name)] = field
             deleted_fields.add(name)
 
@@ -66,62 +154,73 @@ def update_foreign_key_fields(action, input_class):
         input_class._meta.fields[name] = field
 
 
-def create_mutation_class(adapter, action, has_model=True):
-    if has_model:
-        input_meta = type(
-            "Meta",
-            (object,),
-            {
-                "model": action._describer.model,
-                "only_fields": action.determine_fields(),
-                "input_for": action.convert(adapter, input_flag=True),
-            }
-        )
-
-        input_class = type(
-            "{}{}Input".format(action._describer.model.__name__, action._name.capitalize()),
-            (DjangoInputObjectType,),
-            {
-                "Meta": input_meta
-            }
-        )
-
-        # consider field_kwargs
-        for field, kwargs in action.field_kwargs.items():
-            if field not in input_class._meta.input_fields:
-                raise ValueError("Unknown field: `{}`".format(field))
-
-            old_type = input_class._meta.input_fields[field].type
-
-            if isinstance(old_type, NonNull):
-                was_required = True
-                new_type = old_type.of_type
-            elif isclass(old_type):
+def create_input_class(adapter, action):
+    input_meta = type(
+        "Meta",
+        (object,),
+        {
+            "model": action._describer.model,
+            "only_fields": action.determine_fields(),
+            "input_for": action.convert(adapter, input_flag=True),
+        }
+    )
+
+    input_class = type(
+        "{}{}Input".format(action._describer.model.__name__, action._name.capitalize()),
+        (DjangoInputObjectType,),
+        {
+            "Meta": input_meta
+        }
+    )
+
+    # consider field_kwargs
+    for field, kwargs in action.field_kwargs.items():
+        if field not in input_class._meta.input_fields:
+            raise ValueError("Unknown field: `{}`".format(field))
+
+        old_type = input_class._meta.input_fields[field].type
+
+        if isinstance(old_type, NonNull):
+            was_required = True
+            new_type = old_type.of_type
+        elif isclass(old_type):
+            was_required = False
+            new_type = NonNull(old_type)
+        else:
+            if in_kwargs_and_true(kwargs, "required"):
                 was_required = False
-                new_type = NonNull(old_type)
+                new_type = NonNull(graphene.ID)
+            elif in_kwargs_and_false(kwargs, "required"):
+                was_required = True
+                new_type = graphene.ID
             else:
-                if in_kwargs_and_true(kwargs, "required"):
-                    was_required = False
-                    new_type = NonNull(graphene.ID)
-                elif in_kwargs_and_false(kwargs, "required"):
-                    was_required = True
-                    new_type = graphene.ID
-                else:
-                    raise ValueError("Invalid field kwargs.")
+                raise ValueError("Invalid field kwargs.")
 
-            if (was_required and in_kwargs_and_false(kwargs, "required")) or (
-                    not was_required and in_kwargs_and_true(kwargs, "required")):
-                input_class._meta.input_fields[field] = InputField(new_type)
+        if (was_required and in_kwargs_and_false(kwargs, "required")) or (
+                not was_required and in_kwargs_and_true(kwargs, "required")):
+            input_class._meta.input_fields[field] = InputField(new_type)
 
-        # append _id to foreign key names
-        update_foreign_key_fields(action, input_class)
+    # append _id to foreign key names
+    update_foreign_key_fields(action, input_class)
 
-        # add extra fields to input type
-        for name, return_type in action.extra_fields.items():
-            if name in input_class._meta.input_fields:
-                raise ValueError("Duplicate field: `{}`".format(name))
-            input_class._meta.input_fields[name] = get_instantiated_type(return_type).convert(adapter, input_field=True)
-        input_type = input_class(required=True)
+    # add extra fields to input type
+    for name, return_type in action.extra_fields.items():
+        if name in input_class._meta.input_fields:
+            raise ValueError("Duplicate field: `{}`".format(name))
+        input_class._meta.input_fields[name] = get_instantiated_type(return_type).convert(adapter, input_field=True)
+
+    return input_class
+
+
+def create_mutation_class(adapter, action, has_model=True, input_class=None, bulk=False, permissions=None):
+    """
+    Creates the mutation of an action. The bulk form of a model action takes a list of inputs and returns a list of
+    objects.
+    """
+    if bulk:
+        input_type = graphene.List(NonNull(input_class), required=True)
+    elif has_model:
+        input_type = (input_class or create_input_class(adapter, action))(required=True)
     else:
         input_type = get_instantiated_type(action.input_type).convert(adapter, input=True)
 
@@ -133,19 +232,32 @@ def create_mutation_class(adapter, action, has_model=True):
         }
     )
 
-    return_fields = create_return_fields(adapter, action)
+    name = action.get_name()
+
+    if bulk:
+        name = "{}_BULK".format(name)
+        return_fields = {"objects": graphene.List(adapter.type_classes[action._describer.model])}
+    elif action.async_exec:
+        return_fields = {"job": graphene.Field(adapter.job_type)}
+    else:
+        return_fields = create_return_fields(adapter, action)
+
+    if isinstance(action, UpsertAction):
+        mutate = create_upsert_mutate_method(action, bulk=bulk, permissions=permissions)
+    else:
+        mutate = create_mutate_method(action, has_model=has_model, permissions=permissions,
+                                      job_runner=adapter.job_runner)
 
     mutation_class = type(
-        "{}Mutation".format(to_camelcase(action.get_name())),
+        "{}Mutation".format(to_camelcase(name)),
         (graphene.Mutation,),
         {
             **return_fields,
             "Arguments": arguments_class,
-            "mutate": create_mutate_method(action, has_model=has_model),
+            "mutate": mutate,
         }
     )
 
-    name = action.get_name()
     register_action_name(adapter, name)
     mutation_class._name = name
 
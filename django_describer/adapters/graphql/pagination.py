@@ -1,31 +1,136 @@
 from math import fabs
 
+import graphene
+from django.db.models import F
+from graphene.utils.str_converters import to_camel_case
 from graphene_django_extras import LimitOffsetGraphqlPagination
 from graphene_django_extras.paginations.utils import _nonzero_int
 
 
+class Ordering:
+    """
+    Ordering of lists, precomputed once per describer: an Enum of allowed values (e.g. `pageCount_DESC`), each mapped
+    to an OrderBy expression. Unless ordered by a unique field, the pk is appended as a tiebreaker, so that the order
+    is total and pages never overlap.
+    """
+
+    def __init__(self, name, fields, unique_fields=("pk",)):
+        """
+        fields: names of fields (or lookups) to order by.
+        unique_fields: names of non-nullable unique fields, which make the order total by themselves.
+        """
+        values = []
+        self.expressions = {}  # key: enum value, value: OrderBy
+        for field in fields:
+            values.append(("{}_ASC".format(to_camel_case(field)), field))
+            values.append(("{}_DESC".format(to_camel_case(field)), "-{}".format(field)))
+            self.expressions[field] = F(field).asc(nulls_first=True)
+            self.expressions["-{}".format(field)] = F(field).desc(nulls_first=True)
+
+        self.enum = graphene.Enum(name, values)
+        self.unique_values = {value for value in self.expressions if value.lstrip("-") in unique_fields}
+        self.tiebreaker = F("pk").asc()
+
+    def argument(self):
+        return graphene.List(graphene.NonNull(self.enum), description="Fields to order by, the most significant first.")
+
+    def order_queryset(self, qs, values):
+        expressions = [self.expressions[value] for value in values]
+        if self.unique_values.isdisjoint(values):
+            expressions.append(self.tiebreaker)
+        return qs.order_by(*expressions)
+
+    def order_list(self, objs, values):
+        """
+        Orders a list of prefetched objects by stable sorts from the least significant field, the same way as
+        order_queryset: None first in both directions and the pk as the tiebreaker.
+        """
+        objs = list(objs)
+        if self.unique_values.isdisjoint(values):
+            objs.sort(key=lambda obj: obj.pk)
+        for value in reversed(values):
+            path = value.lstrip("-").split("__")
+            descending = value.startswith("-")
+            objs.sort(key=lambda obj: _sort_key(_get_path(obj, path), descending), reverse=descending)
+        return objs
+
+
 class LimitOffsetOrderingGraphqlPagination(LimitOffsetGraphqlPagination):
+    def __init__(self, *args, ordering=None, max_rows=None, chunk_size=None, **kwargs):
+        """
+        ordering: an Ordering the lists can be ordered by.
+        max_rows: hard cap of rows returned when no limit is given, None for no cap.
+        chunk_size: when no limit is given, fetch the rows in chunks of this size instead of all at once.
+        """
+        super().__init__(*args, **kwargs)
+        self.ordering_type = ordering
+        self.max_rows = max_rows
+        self.chunk_size = chunk_size
+
+    def to_graphql_fields(self):
+        fields = super().to_graphql_fields()
+        if self.ordering_type is not None:
+            fields[self.ordering_param] = self.ordering_type.argument()
+        return fields
+
+    def order(self, qs, order):
+        """
+        Orders a queryset, or a list of prefetched objects.
+        """
+        if isinstance(qs, list):
+            return self.ordering_type.order_list(qs, order)
+        return self.ordering_type.order_queryset(qs, order)
+
     def paginate_queryset(self, qs, **kwargs):
         """
         The original method is not sorting when limit = None
         """
-        order = kwargs.pop(self.ordering_param, None) or self.ordering
+        order = kwargs.pop(self.ordering_param, None)
 
         if order:
-            if "," in order:
-                order = order.strip(",").replace(" ", "").split(",")
-                if order.__len__() > 0:
-                    qs = qs.order_by(*order)
-            else:
-                qs = qs.order_by(order)
+            qs = self.order(qs, order)
 
         limit = _nonzero_int(
             kwargs.get(self.limit_query_param, None), strict=True, cutoff=self.max_limit
         )
 
+        offset = kwargs.get(self.offset_query_param, None) or 0
+
+        # slices of an unordered queryset may overlap
+        if (limit is not None or offset) and not isinstance(qs, list) and not qs.ordered:
+            qs = qs.order_by("pk")
+
         if limit is None:
+            return self.unpaginated(qs[offset:] if offset else qs)
+
+        return qs[offset: offset + int(fabs(limit))]
+
+    def unpaginated(self, qs):
+        """
+        Caps the rows and, if possible, fetches them from the database in chunks. graphene still builds the whole
+        list of results before anything is serialized, so nothing is streamed to the client; chunking only avoids
+        holding all raw rows of the database cursor at once.
+        """
+        if self.max_rows is not None:
+            qs = qs[:self.max_rows]
+
+        # prefetching is ignored by iterator()
+        if self.chunk_size is None or isinstance(qs, list) or qs._prefetch_related_lookups:
             return qs
 
-        offset = kwargs.get(self.offset_query_param, 0)
+        return qs.iterator(chunk_size=self.chunk_size)
+
+
+def _get_path(obj, path):
+    for name in path:
+        if obj is None:
+            return None
+        obj = getattr(obj, name)
+    return obj
+
 
-        return qs[offset: offset + fabs(limit)]
+def _sort_key(value, descending=False):
+    # None is first whether the sort is reversed or not
+    if descending:
+        return value is None, value
+    return value is not None, value
@@ -0,0 +1,222 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def get_current_profile():
+    """
+    Returns the Profile of the operation executed by the current thread, or None if it is not profiled.
+    """
+    return getattr(_local, "profile", None)
+
+
+class ResolverTimingMiddleware:
+    """
+    GraphQL middleware recording the start and the duration of each resolver of a profiled operation. The duration
+    covers the synchronous part of the resolver, callbacks of returned promises run later.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def resolve(self, next, root, info, **kwargs):
+        start = time.perf_counter()
+        result = next(root, info, **kwargs)
+        self.profile.add_resolver(info, start, time.perf_counter())
+        return result
+
+
+class StackSampler(threading.Thread):
+    """
+    Collects stacks of a thread every interval seconds, counted by their folded form `outer;...;inner`.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id, None)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class Profile:
+    """
+    A profile of a single operation: resolver timings and either cProfile statistics or stack samples.
+    """
+
+    def __init__(self, operation_name, mode, interval):
+        self.operation_name = operation_name
+        self.mode = mode
+        self.interval = interval
+        self.resolvers = []
+        self.profiler = None
+        self.sampler = None
+        self.start = None
+        self.duration = None
+        self.middleware = ResolverTimingMiddleware(self)
+
+    def add_resolver(self, info, start, end):
+        self.resolvers.append({
+            "path": [str(key) for key in info.path],
+            "field": "{}.{}".format(info.parent_type.name, info.field_name),
+            "start": start - self.start,
+            "duration": end - start,
+        })
+
+    def __enter__(self):
+        _local.profile = self
+        self.start = time.perf_counter()
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+            except ValueError:
+                # Python 3.12+ allows a single active profiler, e. g. of another operation in another thread
+                logger.warning("Another profiler is active, `%s` is profiled by sampling.", self.operation_name)
+                self.mode = "sampling"
+        if self.mode == "sampling":
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            self.sampler = sampler
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.duration = time.perf_counter() - self.start
+        _local.profile = None
+
+    def get_fields(self):
+        """
+        Returns the total time and the number of calls of each resolved field, the slowest first.
+        """
+        fields = defaultdict(lambda: {"duration": 0, "calls": 0})
+        for resolver in self.resolvers:
+            fields[resolver["field"]]["duration"] += resolver["duration"]
+            fields[resolver["field"]]["calls"] += 1
+        return dict(sorted(fields.items(), key=lambda item: -item[1]["duration"]))
+
+    def get_stats(self):
+        return pstats.Stats(self.profiler) if self.profiler is not None else None
+
+    def as_dict(self, top=50):
+        ret = {
+            "operation_name": self.operation_name,
+            "mode": self.mode,
+            "duration": self.duration,
+            "fields": self.get_fields(),
+            "resolvers": self.resolvers,
+        }
+        if self.sampler is not None:
+            ret["samples"] = dict(self.sampler.samples.most_common())
+        if self.profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            ret["stats"] = out.getvalue()
+        return ret
+
+
+class Profiler:
+    """
+    Profiles a random sample of executed operations. Each profile is written to a directory, as JSON with the
+    resolver timings and the stack samples (plus a .prof file of cProfile statistics), and/or passed to a callback.
+    """
+
+    def __init__(self, rate=0.01, operations=None, mode="sampling", interval=0.005, directory=None, callback=None):
+        """
+        rate: the probability of an operation being profiled.
+        operations: names of operations to profile, None for all of them.
+        mode: "sampling" collects stacks by a background thread every interval seconds, "cprofile" uses cProfile,
+            which is more precise but slows the profiled operation down.
+        directory: a directory to write the profiles to.
+        callback: a function called with each Profile.
+        """
+        if mode not in ("sampling", "cprofile"):
+            raise ValueError("Unknown profiling mode: {}.".format(mode))
+        if directory is None and callback is None:
+            raise ValueError("Either directory or callback has to be set.")
+
+        self.rate = rate
+        self.operations = frozenset(operations) if operations is not None else None
+        self.mode = mode
+        self.interval = interval
+        self.directory = directory
+        self.callback = callback
+
+    def sample(self):
+        return random.random() < self.rate
+
+    def is_enabled(self, operation_name):
+        return self.operations is None or operation_name in self.operations
+
+    def profile(self, operation_name, fn):
+        """
+        Calls fn and saves its profile. Failures to profile it or to save the profile are logged, they never fail the
+        operation.
+        """
+        profile = Profile(operation_name, self.mode, self.interval)
+        try:
+            profile.__enter__()
+        except Exception:
+            logger.exception("Profiling `%s` failed.", operation_name)
+            profile.__exit__(None, None, None)
+            return fn()
+
+        try:
+            result = fn()
+        finally:
+            profile.__exit__(None, None, None)
+
+        try:
+            self.save(profile)
+        except Exception:
+            logger.exception("Saving the profile of `%s` failed.", operation_name)
+        return result
+
+    def save(self, profile):
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            # the operation name comes from the client
+            name = re.sub(r"[^A-Za-z0-9_]", "_", profile.operation_name or "anonymous")[:64]
+            path = os.path.join(self.directory, "{}-{}-{}".format(
+                time.strftime("%Y%m%d%H%M%S"), name, uuid.uuid4().hex[:8]))
+            with open(path + ".json", "w") as f:
+                json.dump(profile.as_dict(), f)
+            if profile.profiler is not None:
+                profile.profiler.dump_stats(path + ".prof")
+
+        if self.callback is not None:
+            self.callback(profile)
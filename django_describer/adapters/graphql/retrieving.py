@@ -1,13 +1,24 @@
+import json
+import logging
+
 import django.db.models
 import graphene
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
 from graphene_django_extras import DjangoObjectType, DjangoListObjectType
 from graphene_django_extras.settings import graphql_api_settings
 
 from django_describer.adapters.utils import register_action_name
 from ...datatypes import String, Integer, Float, Boolean, NullType, get_instantiated_type
 from .converter import convert_local_fields
-from .pagination import LimitOffsetOrderingGraphqlPagination
-from ...utils import field_names, get_all_model_fields
+from .fields import aggregate_functions, annotation_attr
+from .pagination import LimitOffsetOrderingGraphqlPagination, Ordering
+from ...entities import load_entity
+from ...permissions import specialize_permissions
+from ...utils import get_model_meta, get_indexed_field_names, indexable_lookups
+
+
+logger = logging.getLogger(__name__)
 
 
 # mapping of alien types to django_describer ones
@@ -28,17 +39,35 @@ class Query:
     """
 
 
-def create_type_class(describer):
+def get_field_permissions(describer, field):
+    if field in describer.get_field_permissions():
+        return describer.get_field_permissions()[field]
+    return describer.get_default_field_permissions()
+
+
+def get_denied_fields(describer, role):
+    """
+    Returns names of the describer's fields denied to the role by their permissions. None denies nothing.
     """
-    Creates a DjangoObjectType and a DjangoListObjectType for a model, and links them together.
+    return {field for field in describer.get_fields()
+            if get_field_permissions(describer, field) and
+            specialize_permissions(get_field_permissions(describer, field), role) is None}
+
+
+def create_type_class(describer, role=None):
+    """
+    Creates a DjangoObjectType and a DjangoListObjectType for a model, and links them together. Fields denied to the
+    role can neither be filtered nor ordered by.
     Must be in this order!!!
     """
+    denied_fields = get_denied_fields(describer, role)
+
     type_meta = type(
         "Meta",
         (object,),
         {
             "model": describer.model,
-            "filter_fields": create_filter_fields(describer),
+            "filter_fields": create_filter_fields(describer, denied_fields),
             "only_fields": describer.get_fields(),
         }
     )
@@ -60,7 +89,10 @@ def create_type_class(describer):
             "model": describer.model,
             "pagination": LimitOffsetOrderingGraphqlPagination(
                 default_limit=describer.default_page_size or graphql_api_settings.DEFAULT_PAGE_SIZE,
-                max_limit=describer.max_page_size or graphql_api_settings.DEFAULT_PAGE_SIZE
+                max_limit=describer.max_page_size or graphql_api_settings.DEFAULT_PAGE_SIZE,
+                ordering=create_ordering(describer, denied_fields),
+                max_rows=describer.max_unpaginated_rows,
+                chunk_size=describer.chunk_size,
             ),
         }
     )
@@ -76,23 +108,34 @@ def create_type_class(describer):
     return type_class
 
 
-def create_filter_fields(describer):
+def create_filter_fields(describer, denied_fields=()):
     """
-    Creates dictionary of filters based on field types.
+    Creates dictionary of filters based on field types. If the describer is index aware, only lookups which can use
+    an index are exposed, unless they are explicitly allowed in expensive_filters.
     """
     filter_fields = {}
-    field_names = (f.name for f in describer.model._meta.fields)
+    indexed_fields = get_indexed_field_names(describer.model)
 
-    for field_name in field_names:
-        if isinstance(describer.model._meta.get_field(field_name), django.db.models.ForeignKey):
+    for field in describer.model._meta.fields:
+        if field.name in denied_fields:
+            continue
+        if isinstance(field, django.db.models.ForeignKey):
             # handle foreign keys
-            filter_fields[field_name + "_id"] = Integer.filters()
+            filter_name = field.name + "_id"
+            lookups = Integer.filters()
         else:
             # get the filters for each field based on their types (NullType stands for unknown field type)
-            field_type = _reverse_field_map.get(describer.model._meta.get_field(field_name).__class__, NullType)
+            filter_name = field.name
+            lookups = _reverse_field_map.get(field.__class__, NullType).filters()
+
+        if describer.index_aware:
+            allowed = describer.get_expensive_filters().get(field.name, ()) + \
+                describer.get_expensive_filters().get(filter_name, ())
+            lookups = tuple(lookup for lookup in lookups
+                            if _is_indexed_lookup(indexed_fields, field.name, lookup) or lookup in allowed)
 
-            # add the filters to the output
-            filter_fields[field_name] = field_type.filters()
+        # add the filters to the output
+        filter_fields[filter_name] = lookups
 
     # add custom filters
     for field_name, field_type in describer.extra_filters.items():
@@ -101,9 +144,156 @@ def create_filter_fields(describer):
     return filter_fields
 
 
+def create_ordering_fields(describer):
+    """
+    Returns names of fields the lists can be ordered by, or None if any field is allowed. If the describer is index
+    aware, only indexed fields and fields in expensive_ordering are allowed.
+    """
+    if not describer.index_aware:
+        return None
+
+    indexed_fields = get_indexed_field_names(describer.model)
+    ordering_fields = set(describer.get_expensive_ordering())
+
+    for field in describer.model._meta.fields:
+        if field.name in indexed_fields and field.name in describer.get_fields():
+            ordering_fields.add(field.name)
+            ordering_fields.add(field.attname)
+
+    return tuple(sorted(ordering_fields))
+
+
+def create_ordering(describer, denied_fields=()):
+    """
+    Returns the Ordering of the describer's lists. Foreign keys are ordered by their raw values, to avoid joins.
+    """
+    model = describer.model
+    ordering_fields = create_ordering_fields(describer)
+
+    fields = []
+    for field in model._meta.concrete_fields:
+        if field.name not in describer.get_fields() or field.name in denied_fields:
+            continue
+        if ordering_fields is None or field.name in ordering_fields or field.attname in ordering_fields:
+            fields.append(field.attname)
+
+    # lookups of related fields allowed by expensive_ordering
+    if ordering_fields is not None:
+        fields.extend(name for name in ordering_fields
+                      if "__" in name and name.split("__")[0] not in denied_fields)
+
+    unique_fields = ["pk"] + [field.attname for field in model._meta.concrete_fields
+                              if field.unique and not field.null]
+
+    return Ordering("{}Ordering".format(model.__name__), fields, unique_fields=unique_fields)
+
+
+def _is_indexed_lookup(indexed_fields, field_name, lookup):
+    return field_name in indexed_fields and lookup in indexable_lookups
+
+
+def get_unindexed_exposures(describer, filter_fields, ordering_fields):
+    """
+    Returns filters (as `field__lookup`) and ordering fields of the model which cannot use any index.
+    """
+    indexed_fields = get_indexed_field_names(describer.model)
+    unindexed_filters = []
+    unindexed_ordering = []
+
+    for field in describer.model._meta.fields:
+        # filters of foreign keys are named by their attnames
+        for lookup in filter_fields.get(field.attname, ()):
+            if not _is_indexed_lookup(indexed_fields, field.name, lookup):
+                unindexed_filters.append("{}__{}".format(field.attname, lookup))
+
+        if field.name in indexed_fields or field.name not in describer.get_fields():
+            continue
+        if ordering_fields is None or field.name in ordering_fields or field.attname in ordering_fields:
+            unindexed_ordering.append(field.name)
+
+    return unindexed_filters, unindexed_ordering
+
+
+def report_unindexed_exposures(describer, filter_fields, ordering_fields):
+    """
+    Logs filters and ordering which will result in sequential scans.
+    """
+    unindexed_filters, unindexed_ordering = get_unindexed_exposures(describer, filter_fields, ordering_fields)
+
+    if unindexed_filters:
+        logger.info("`%s` exposes unindexed filters: %s.", describer.model.__name__, ", ".join(unindexed_filters))
+    if unindexed_ordering:
+        logger.info("`%s` exposes unindexed ordering: %s.", describer.model.__name__, ", ".join(unindexed_ordering))
+
+
+def determine_aggregate_fields(action, role=None):
+    """
+    Returns the fields aggregated by the action and the fields it can group by, except those denied to the role.
+    """
+    denied_fields = get_denied_fields(action._describer, role)
+    return tuple(field for field in action.determine_fields() if field not in denied_fields), \
+        tuple(field for field in action.determine_group_by() if field not in denied_fields)
+
+
+def create_aggregate_type_class(adapter, action):
+    """
+    Creates an ObjectType for a row of aggregated values, and an Enum of fields the rows can be grouped by.
+    """
+    model = action._describer.model
+    fields, group_by = determine_aggregate_fields(action, adapter.role)
+
+    attrs = {"count": graphene.Int(required=True)}
+
+    # all fields may be denied to the role
+    if fields:
+        values_class = type(
+            "{}AggregateValuesType".format(model.__name__),
+            (graphene.ObjectType,),
+            {field: graphene.Float() for field in fields}
+        )
+        attrs.update({function_name: graphene.Field(values_class) for function_name in aggregate_functions})
+
+    for field in group_by:
+        django_field = model._meta.get_field(field)
+        if isinstance(django_field, django.db.models.ForeignKey):
+            field_type = Integer
+        else:
+            field_type = _reverse_field_map.get(django_field.__class__, String)
+        attrs[field] = field_type(required=False).convert(adapter)
+
+    type_class = type(
+        "{}AggregateType".format(model.__name__),
+        (graphene.ObjectType,),
+        attrs
+    )
+
+    group_by_enum = None
+    if group_by:
+        group_by_enum = graphene.Enum("{}AggregateGroupBy".format(model.__name__), [(f, f) for f in group_by])
+
+    return type_class, group_by_enum
+
+
+def create_changes_type_class(action):
+    """
+    Creates an ObjectType for the ids of objects changed since a cursor.
+    """
+    return type(
+        "{}ChangesType".format(action._describer.model.__name__),
+        (graphene.ObjectType,),
+        {
+            "created": graphene.List(graphene.NonNull(graphene.ID), required=True),
+            "updated": graphene.List(graphene.NonNull(graphene.ID), required=True),
+            "deleted": graphene.List(graphene.NonNull(graphene.ID), required=True),
+            "cursor": graphene.String(required=True),
+            "has_more": graphene.Boolean(required=True),
+        }
+    )
+
+
 def create_query_class(adapter, actions):
     """
-    Creates a Query class, featuring listing and detail methods.
+    Creates a Query class, featuring listing and detail methods. Actions denied to the adapter's role are left out.
     """
 
     attrs = {}
@@ -112,14 +302,17 @@ def create_query_class(adapter, actions):
         if not action.read_only:
             continue
 
+        permissions = specialize_permissions(action.get_permissions(), adapter.role)
+        if permissions is None:
+            continue
+
         name = action.get_name()
         register_action_name(adapter, name)
 
         attrs[name] = action.convert(adapter)
 
-        if action.get_permissions():
-            attrs["resolve_{}".format(name)] = create_permissions_check_method(
-                permission_classes=action.get_permissions())
+        if permissions:
+            attrs["resolve_{}".format(name)] = create_permissions_check_method(permission_classes=permissions)
 
     query_class = type(
         "Query",
@@ -130,45 +323,152 @@ def create_query_class(adapter, actions):
     return query_class
 
 
-def add_permissions_to_type_class(describer, type_class):
+def add_permissions_to_type_class(describer, type_class, role=None):
     """
-    Adds permissions to the given DjangoObjectType class.
+    Adds permissions to the given DjangoObjectType class. For a role, fields denied to it are removed and only the
+    permissions not resolved by the role are checked.
     """
     for field in describer.get_fields():
-        permissions = None
+        permissions = get_field_permissions(describer, field)
 
-        if field in describer.get_field_permissions():
-            permissions = describer.get_field_permissions()[field]
-        elif describer.get_default_field_permissions():
-            permissions = describer.get_default_field_permissions()
+        if permissions:
+            permissions = specialize_permissions(permissions, role)
+            if permissions is None:
+                type_class._meta.fields.pop(field, None)
+                continue
 
         if permissions:
             setattr(type_class,
                     "resolve_{}".format(field),
-                    create_permissions_check_method(field, permissions))
+                    create_permissions_check_method(field, permissions,
+                                                    resolver=getattr(type_class, "resolve_{}".format(field), None)))
+
+
+def add_entity_resolvers_to_type_class(describer, type_class):
+    """
+    Resolves forward foreign keys of the given DjangoObjectType class through the entity cache.
+    """
+    for field in describer.model._meta.concrete_fields:
+        if (field.many_to_one or field.one_to_one) and field.name in describer.get_fields():
+            setattr(type_class, "resolve_{}".format(field.name), create_entity_resolver(field))
+
+
+def create_entity_resolver(field):
+    """
+    Loads the related object from the entity cache, unless it has been fetched together with the object. Like Django's
+    related object access, it uses the base manager, so that a filtering default manager does not hide it.
+    """
+    def resolver(root, info, **kwargs):
+        if field.is_cached(root):
+            return getattr(root, field.name)
+
+        pk = getattr(root, field.attname)
+        if pk is None:
+            return None
+        obj = load_entity(info.context, field.related_model, pk, base_manager=True)
+        field.set_cached_value(root, obj)
+        return obj
+
+    return resolver
 
 
 def add_extra_fields_to_type_class(adapter, describer, type_class):
     """
     Adds extra fields to the given DjangoObjectType class. Ensures no base fields get overwritten.
     """
-    existing_fields = field_names(get_all_model_fields(describer.model))
+    existing_fields = get_model_meta(describer.model).all_field_names
 
     for field_name, return_type in describer.get_extra_fields().items():
         if field_name in existing_fields:
             raise ValueError("This field already exists.")
 
-        type_class._meta.fields[field_name] = get_instantiated_type(return_type).convert(
-            adapter, property_name=field_name)
+        return_type = get_instantiated_type(return_type)
 
+        # unfiltered lists of a relation can be counted by a counter field
+        counter_field = None
+        if getattr(return_type, "via", None) is not None and return_type.filter is None:
+            counter_field = describer.get_counter_field(return_type.via)
 
-def create_global_query_class(query_classes, non_model_query_class):
-    return type("Query", query_classes.values() + (non_model_query_class,) + (graphene.ObjectType,), {})
+        type_class._meta.fields[field_name] = return_type.convert(
+            adapter, property_name=field_name, counter_field=counter_field)
 
+        if getattr(return_type, "expression", None) is not None:
+            type_class._meta.fields[field_name].resolver = create_annotation_resolver(
+                describer.model, field_name, return_type.expression)
 
-def create_permissions_check_method(field_name=None, permission_classes=()):
+
+def create_annotation_resolver(model, field_name, expression):
+    """
+    Reads the value annotated by the list or detail resolver. Objects fetched otherwise, e.g. as related objects or by
+    a custom fetch_fn, are annotated by an extra query.
+    """
+    attr = annotation_attr(field_name)
+
+    def resolver(root, info, **kwargs):
+        if hasattr(root, attr):
+            return getattr(root, attr)
+        return model._default_manager.filter(pk=root.pk).annotate(**{attr: expression}).values_list(
+            attr, flat=True).first()
+
+    return resolver
+
+
+def create_global_query_class(query_classes, non_model_query_class, extra_query_classes=()):
+    return type("Query", query_classes.values() + (non_model_query_class,) + tuple(extra_query_classes) +
+                (graphene.ObjectType,), {})
+
+
+def create_job_type_class():
+    """
+    Creates an ObjectType of background jobs. The result is the JSON of the exec_fn's return value.
+    """
+    return type(
+        "JobType",
+        (graphene.ObjectType,),
+        {
+            "id": graphene.ID(required=True),
+            "action": graphene.String(required=True),
+            "status": graphene.String(required=True),
+            "result": graphene.JSONString(resolver=lambda root, info: json.loads(root.result) if root.result else None),
+            "error": graphene.String(),
+            "created_at": graphene.DateTime(required=True),
+            "started_at": graphene.DateTime(),
+            "finished_at": graphene.DateTime(),
+        }
+    )
+
+
+def create_job_query_class(job_type):
     """
-    Generator of methods to check permissions for both ListFields and Fields.
+    Creates a Query class with the status and the result of a job. Jobs enqueued by a user are visible only to them.
+    """
+    def resolve_job(root, info, id):
+        from ...models import Job
+
+        try:
+            job = Job.objects.filter(pk=id).first()
+        except ValidationError:
+            return None
+        user = getattr(info.context, "user", None)
+        if job is not None and job.user_id is not None and (
+                user is None or not user.is_authenticated or str(user.pk) != job.user_id):
+            raise PermissionError(_("You don't have permission to do this."))
+        return job
+
+    return type(
+        "Query",
+        (Query,),
+        {
+            "job": graphene.Field(job_type, id=graphene.ID(required=True)),
+            "resolve_job": staticmethod(resolve_job),
+        }
+    )
+
+
+def create_permissions_check_method(field_name=None, permission_classes=(), resolver=None):
+    """
+    Generator of methods to check permissions for both ListFields and Fields. Fields are resolved by the resolver, if
+    given.
     """
     def method(root, info, results=None, **kwargs):
         for permission_class in permission_classes:
@@ -176,6 +476,9 @@ def create_permissions_check_method(field_name=None, permission_classes=()):
             if not pc.has_permission():
                 raise PermissionError(pc.error_message())
 
+        if resolver is not None:
+            return resolver(root, info, **kwargs)
+
         # return only for non-list Fields
         if field_name and hasattr(root, field_name):
             return getattr(root, field_name)
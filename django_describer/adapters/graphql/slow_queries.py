@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+
+from django.db import connections, transaction
+
+
+_local = threading.local()
+
+REDACTED = "[redacted]"
+
+
+def get_current_recorder():
+    """
+    Returns the QueryRecorder of the operation executed by the current thread, or None if it is not recorded.
+    """
+    return getattr(_local, "recorder", None)
+
+
+def redact(value, keys):
+    """
+    Replaces values of dict keys containing any of the keys (case insensitive), recursively.
+    """
+    if isinstance(value, dict):
+        return {k: REDACTED if any(key in str(k).lower() for key in keys) else redact(v, keys)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, keys) for v in value]
+    return value
+
+
+class PathMiddleware:
+    """
+    GraphQL middleware remembering the path of the last started resolver. Resolvers return lazy querysets, which are
+    evaluated just after, so the statements are attributed to the resolver which built them.
+    """
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def resolve(self, next, root, info, **kwargs):
+        self.recorder.path = ".".join(str(key) for key in info.path)
+        return next(root, info, **kwargs)
+
+
+class QueryRecorder:
+    """
+    An execute wrapper recording SQL statements with their timings.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.path = None
+        self.middleware = PathMiddleware(self)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append({
+                "sql": sql,
+                "params": params,
+                "many": many,
+                "using": context["connection"].alias,
+                "path": self.path,
+                "duration": time.perf_counter() - start,
+            })
+
+    def __enter__(self):
+        _local.recorder = self
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        _local.recorder = None
+
+
+class SlowQueryLog:
+    """
+    Logs operations taking longer than threshold seconds: the operation name, the redacted variables, every SQL
+    statement issued with its timing and the resolver path which issued it, and optionally EXPLAIN of the slowest
+    statements. Entries are JSON lines written to a rotating file, or to the `django_describer.slow_queries` logger.
+    """
+
+    def __init__(self, threshold=1.0, path=None, max_bytes=10 * 1024 * 1024, backup_count=5, explain=0,
+                 analyze=False, redacted_keys=("password", "secret", "token"), log_params=False, rate=1.0):
+        """
+        threshold: seconds an operation has to take to be logged.
+        path: the log file, rotated after max_bytes with backup_count backups. None to log to the logger only.
+        explain: the number of slowest SELECT statements to EXPLAIN.
+        analyze: run EXPLAIN ANALYZE where supported. The statements are executed again, avoid it in production.
+        redacted_keys: variables containing any of these in their name are redacted.
+        log_params: log the parameters of the statements, which are not redacted.
+        rate: the probability of an operation being recorded.
+        """
+        self.threshold = threshold
+        self.explain = explain
+        self.analyze = analyze
+        self.redacted_keys = tuple(key.lower() for key in redacted_keys)
+        self.log_params = log_params
+        self.rate = rate
+
+        self.logger = logging.getLogger("django_describer.slow_queries")
+        if path is not None:
+            path = os.path.abspath(path)
+            if not any(getattr(handler, "baseFilename", None) == path for handler in self.logger.handlers):
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self.logger.addHandler(handler)
+            self.logger.propagate = False
+            self.logger.setLevel(logging.WARNING)
+
+    def record(self, fn, get_operation_name, variables):
+        """
+        Calls fn, logging its statements if it is slow. The operation name is determined only then.
+        """
+        if random.random() >= self.rate:
+            return fn()
+
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            result = fn()
+        duration = time.perf_counter() - start
+
+        if duration >= self.threshold:
+            self.log(get_operation_name(), variables, duration, recorder.statements)
+        return result
+
+    def explain_statement(self, statement):
+        """
+        Returns the plan of the statement. It is explained in a savepoint, so that a failure does not abort a
+        transaction still in progress (e. g. with ATOMIC_REQUESTS) and the effects of EXPLAIN ANALYZE are discarded.
+        """
+        using = statement["using"]
+        connection = connections[using]
+        try:
+            if self.analyze:
+                prefix = connection.ops.explain_query_prefix(analyze=True)
+            else:
+                prefix = connection.ops.explain_query_prefix()
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.execute("{} {}".format(prefix, statement["sql"]), statement["params"])
+                    plan = "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+                transaction.set_rollback(True, using=using)
+            return plan
+        except Exception as e:
+            return "EXPLAIN failed: {}".format(e)
+
+    def log(self, operation_name, variables, duration, statements):
+        entry = {
+            "operation_name": operation_name,
+            "variables": redact(variables, self.redacted_keys),
+            "duration": duration,
+            "statements": [
+                {k: v for k, v in statement.items() if self.log_params or k != "params"} for statement in statements
+            ],
+        }
+
+        if self.explain:
+            selects = [statement for statement in statements
+                       if not statement["many"] and statement["sql"].lstrip().upper().startswith("SELECT")]
+            slowest = sorted(selects, key=lambda statement: -statement["duration"])[:self.explain]
+            entry["explain"] = [
+                {"sql": statement["sql"], "duration": statement["duration"], "plan": self.explain_statement(statement)}
+                for statement in slowest
+            ]
+
+        self.logger.warning(json.dumps(entry, default=str))
@@ -0,0 +1,394 @@
+import copy
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import transaction, connections, DEFAULT_DB_ALIAS
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from graphene_django.views import GraphQLView, HttpError
+
+from ...entities import ENTITIES_ATTR
+from .coalescing import default_coalesce_key, operation_key
+from .encoding import create_encodings, negotiate_encoding, compress_response, JSON_CONTENT_TYPE, JSONEncoding
+from .incremental import plan_incremental_delivery, MULTIPART_CONTENT_TYPE
+from .profiling import get_current_profile
+from .slow_queries import get_current_recorder
+
+
+MUTATION_BATCH_ATTR = "_describer_mutation_batch"
+
+
+class MutationBatch:
+    """
+    State of a mutation operation executed in a single transaction. Each mutation field runs in its own savepoint.
+    With fail_fast, the first failing field makes the rest of them fail and the whole transaction is rolled back.
+    """
+
+    def __init__(self, fail_fast=False):
+        self.fail_fast = fail_fast
+        self.failed = False
+
+    def run(self, fn):
+        if self.failed and self.fail_fast:
+            raise RuntimeError("Skipped, a previous mutation in this operation has failed.")
+
+        try:
+            with transaction.atomic():
+                return fn()
+        except Exception:
+            self.failed = True
+            raise
+
+
+def get_mutation_batch(request):
+    return getattr(request, MUTATION_BATCH_ATTR, None)
+
+
+def copy_request(request):
+    """
+    Returns a shallow copy of the request for an operation executed in another thread, without the identity map, as
+    loaded objects must not be shared by threads.
+    """
+    request = copy.copy(request)
+    request.__dict__.pop(ENTITIES_ATTR, None)
+    return request
+
+
+@contextmanager
+def read_snapshot(using=DEFAULT_DB_ALIAS):
+    """
+    Runs the block in a transaction reading a single snapshot of the database: REPEATABLE READ on PostgreSQL, which is
+    the default isolation level of MySQL, while SQLite transactions are serializable. Within an outer transaction, its
+    isolation level is kept.
+    """
+    connection = connections[using]
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        yield
+
+
+class DescriberGraphQLView(GraphQLView):
+    """
+    GraphQLView with optional transactional batching of all mutation fields of an operation. on_commit hooks registered
+    by the mutations are deferred until the whole operation commits.
+
+    Query operations can be coalesced by a SingleFlight shared among requests: identical concurrent operations with
+    the same coalesce_key(request) are executed only once.
+
+    With schemas (key: role, value: Schema) and role_key, each request is executed against the schema of its role,
+    or the default schema if the role has none.
+
+    With batching, a POST of a JSON array of operations is executed as a batch, returning an array of results. The
+    operations share the request, which is their context, with its identity map and database connection. If all of them
+    are queries, they run in batch_workers threads, each of them with its own copy of the request (and identity map)
+    and its own database connection.
+
+    With a profiler, a sample of operations is profiled. With a slow_query_log, SQL statements of operations are
+    recorded and logged if the operation is slow.
+
+    With incremental_delivery, queries with @defer or @stream requested with `Accept: multipart/mixed` are split into
+    an initial query and a query per deferred fragment or streamed list, executed in a single snapshot. Their results
+    are sent as parts of a multipart response once all of them are executed.
+
+    Responses are encoded by one of encodings (key: name, value: Encoding) negotiated by the Accept header, JSON by
+    default. With compression, responses are compressed by the first of its content codings accepted by the client,
+    streaming responses as they are streamed.
+    """
+
+    atomic_mutations = False
+    fail_fast = False
+    coalescer = None
+    coalesce_key = staticmethod(default_coalesce_key)
+    schemas = None
+    role_key = None
+    batching = False
+    batch_max_size = None
+    batch_workers = None
+    profiler = None
+    slow_query_log = None
+    incremental_delivery = False
+    encodings = None
+    compression = ()
+    compression_min_size = 1024
+
+    def __init__(self, atomic_mutations=False, fail_fast=False, coalescer=None, coalesce_key=None, schemas=None,
+                 role_key=None, batching=False, batch_max_size=None, batch_workers=None, profiler=None,
+                 slow_query_log=None, incremental_delivery=False, encodings=None, compression=(),
+                 compression_min_size=None, **kwargs):
+        super().__init__(**kwargs)
+        self.atomic_mutations = self.atomic_mutations or atomic_mutations
+        self.fail_fast = self.fail_fast or fail_fast
+        self.coalescer = self.coalescer or coalescer
+        if coalesce_key is not None:
+            self.coalesce_key = coalesce_key
+        self.schemas = self.schemas or schemas
+        if role_key is not None:
+            self.role_key = role_key
+        self.role = None
+        self.batching = self.batching or batching
+        self.batch_max_size = self.batch_max_size or batch_max_size
+        self.batch_workers = self.batch_workers or batch_workers
+        self.profiler = self.profiler or profiler
+        self.slow_query_log = self.slow_query_log or slow_query_log
+        self.incremental_delivery = self.incremental_delivery or incremental_delivery
+        self.encodings = self.encodings or encodings or create_encodings()
+        self.encoding = self.encodings[JSONEncoding.name]
+        self.compression = self.compression or compression
+        if compression_min_size is not None:
+            self.compression_min_size = compression_min_size
+        self._body = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if len(self.encodings) > 1:
+            self.encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT", ""), self.encodings)
+
+        response = self.dispatch_operation(request, *args, **kwargs)
+
+        if len(self.encodings) > 1:
+            patch_vary_headers(response, ("Accept",))
+            if response.get("Content-Type", "").startswith(JSON_CONTENT_TYPE):
+                response["Content-Type"] = self.encoding.content_type
+        if self.compression:
+            response = compress_response(request, response, self.compression, self.compression_min_size)
+        return response
+
+    def dispatch_operation(self, request, *args, **kwargs):
+        if self.schemas and self.role_key is not None:
+            self.role = self.role_key(request)
+            self.schema = self.schemas.get(self.role, self.schema)
+
+        if self.batching and request.method.lower() == "post" and self.get_content_type(request) == "application/json":
+            try:
+                self._body = self.parse_json_body(request)
+            except HttpError as e:
+                return self.error_response(request, e)
+            if isinstance(self._body, list):
+                return self.execute_batch(request, self._body)
+
+        if self.incremental_delivery and "multipart/mixed" in request.META.get("HTTP_ACCEPT", ""):
+            try:
+                response = self.execute_incremental(request)
+            except HttpError as e:
+                return self.error_response(request, e)
+            if response is not None:
+                return response
+
+        return super().dispatch(request, *args, **kwargs)
+
+    def execute_incremental(self, request):
+        """
+        Executes a query with deferred fragments or streamed lists, returning a multipart response. Returns None if the
+        operation has none of them.
+        """
+        if request.method.lower() not in ("get", "post"):
+            return None
+
+        self._body = data = self.parse_body(request)
+        if not isinstance(data, dict):
+            return None
+        query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        if not query:
+            return None
+
+        plan = plan_incremental_delivery(self.schema, query, operation_name, variables)
+        if plan is None:
+            return None
+        # parts of a multipart response are always JSON
+        self.encoding = self.encodings[JSONEncoding.name]
+
+        def payloads():
+            # the parts are attached to the items of the initial data by their positions, all of them have to be read
+            # from the same snapshot
+            initial = self.execute_graphql_request(request, data, plan.query, variables, operation_name)
+            payload = {"hasNext": not initial.invalid}
+            if not initial.invalid:
+                payload["data"] = plan.complete_initial_data(initial.data)
+            if initial.errors:
+                payload["errors"] = [self.format_error(e) for e in initial.errors]
+            yield payload
+            if initial.invalid:
+                return
+
+            for index, part in enumerate(plan.parts):
+                result = self.execute_graphql_request(request, data, part.query, variables, operation_name)
+                entries = part.get_entries(result.data) if result.data is not None else []
+                if result.errors:
+                    errors = [self.format_error(e) for e in result.errors]
+                    if entries:
+                        entries[0]["errors"] = errors
+                    else:
+                        entries.append({"path": part.path, "errors": errors})
+                yield {"incremental": entries, "hasNext": index < len(plan.parts) - 1}
+
+        # all parts are executed before anything is sent, a slow client must not hold the snapshot open
+        with read_snapshot():
+            computed = list(payloads())
+
+        def parts():
+            for part_payload in computed:
+                yield "\r\n---\r\nContent-Type: application/json; charset=utf-8\r\n\r\n{}".format(
+                    self.json_encode(request, part_payload))
+            yield "\r\n-----\r\n"
+
+        return StreamingHttpResponse(parts(), content_type=MULTIPART_CONTENT_TYPE)
+
+    def json_encode(self, request, d, pretty=False):
+        # pretty printing is left to the original method
+        if self.encoding.name == JSONEncoding.name and (self.pretty or pretty or request.GET.get("pretty")):
+            return super().json_encode(request, d, pretty)
+        return self.encoding.encode(d)
+
+    def parse_json_body(self, request):
+        """
+        Parses a JSON body into a single operation or a non-empty list of them.
+        """
+        try:
+            body = json.loads(request.body.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(HttpResponseBadRequest("POST body sent invalid JSON."))
+
+        if isinstance(body, list):
+            if not body or not all(isinstance(entry, dict) for entry in body):
+                raise HttpError(HttpResponseBadRequest("A batch must be a non-empty list of operations."))
+            if self.batch_max_size is not None and len(body) > self.batch_max_size:
+                raise HttpError(HttpResponseBadRequest(
+                    "A batch can contain at most {} operations.".format(self.batch_max_size)))
+        elif not isinstance(body, dict):
+            raise HttpError(HttpResponseBadRequest("The received data is not a valid JSON query."))
+        return body
+
+    def parse_body(self, request):
+        # the JSON body has already been parsed by dispatch
+        if self._body is not None:
+            return self._body
+        return super().parse_body(request)
+
+    def error_response(self, request, error):
+        response = error.response
+        response["Content-Type"] = "application/json"
+        response.content = self.json_encode(request, {"errors": [self.format_error(error)]})
+        return response
+
+    def execute_batch(self, request, entries):
+        """
+        Executes the operations of a batch and joins their results into an array. Each result carries the id of
+        its operation and its status code, the response has the highest of them.
+        """
+        # makes get_response add the id and the status to the results
+        self.batch = True
+
+        if self.batch_workers and len(entries) > 1 and all(
+                self.get_entry_operation_type(request, entry) == "query" for entry in entries):
+            with ThreadPoolExecutor(max_workers=self.batch_workers) as executor:
+                responses = list(executor.map(
+                    lambda entry: self.get_threaded_entry_response(copy_request(request), entry), entries))
+        else:
+            responses = [self.get_entry_response(request, entry) for entry in entries]
+
+        return HttpResponse(
+            status=max(status_code for _, status_code in responses),
+            content=self.encoding.join([result for result, _ in responses]),
+            content_type=JSON_CONTENT_TYPE,
+        )
+
+    def get_entry_operation_type(self, request, entry):
+        query, _, operation_name, _ = self.get_graphql_params(request, entry)
+        return self.get_operation_type(request, query, operation_name) if query else None
+
+    def get_entry_response(self, request, entry):
+        """
+        Executes an operation of a batch. Errors of an operation do not affect the others.
+        """
+        try:
+            return self.get_response(request, entry)
+        except HttpError as e:
+            response = {"errors": [self.format_error(e)], "id": entry.get("id"), "status": e.response.status_code}
+            return self.json_encode(request, response), e.response.status_code
+
+    def get_threaded_entry_response(self, request, entry):
+        try:
+            return self.get_entry_response(request, entry)
+        finally:
+            # connections are per thread
+            connections.close_all()
+
+    def get_operation_type(self, request, query, operation_name):
+        try:
+            document = self.get_backend(request).document_from_string(self.schema, query)
+        except Exception:
+            # let the original method report the error
+            return None
+        return document.get_operation_type(operation_name)
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        extra = [observer.middleware for observer in (get_current_profile(), get_current_recorder())
+                 if observer is not None]
+        if not extra:
+            return middleware
+        return list(middleware or ()) + extra
+
+    def get_operation_name(self, request, query, operation_name):
+        """
+        Returns the name of the executed operation, which does not have to be sent if it is the only one.
+        """
+        if operation_name:
+            return operation_name
+        try:
+            operations = self.get_backend(request).document_from_string(self.schema, query).operations_map
+        except Exception:
+            return None
+        return next(iter(operations)) if len(operations) == 1 else None
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        def execute():
+            return self.execute_operation(request, data, query, variables, operation_name, show_graphiql)
+
+        if self.slow_query_log is not None and query:
+            execute_operation = execute
+
+            def execute():
+                return self.slow_query_log.record(
+                    execute_operation, lambda: self.get_operation_name(request, query, operation_name), variables)
+
+        if self.profiler is not None and query and self.profiler.sample():
+            name = self.get_operation_name(request, query, operation_name)
+            if self.profiler.is_enabled(name):
+                return self.profiler.profile(name, execute)
+        return execute()
+
+    def execute_operation(self, request, data, query, variables, operation_name, show_graphiql=False):
+        execute = super().execute_graphql_request
+
+        operation_type = None
+        if query and (self.atomic_mutations or self.coalescer is not None):
+            operation_type = self.get_operation_type(request, query, operation_name)
+
+        if operation_type == "mutation" and self.atomic_mutations:
+            return self.execute_atomic_mutation(request, data, query, variables, operation_name, show_graphiql)
+
+        if operation_type == "query" and self.coalescer is not None:
+            # results of different schemas are never shared
+            key = operation_key(query, variables, operation_name, (self.role, self.coalesce_key(request)))
+            return self.coalescer.do(
+                key, lambda: execute(request, data, query, variables, operation_name, show_graphiql))
+
+        return execute(request, data, query, variables, operation_name, show_graphiql)
+
+    def execute_atomic_mutation(self, request, data, query, variables, operation_name, show_graphiql=False):
+        batch = MutationBatch(fail_fast=self.fail_fast)
+        setattr(request, MUTATION_BATCH_ATTR, batch)
+        try:
+            with transaction.atomic():
+                result = super().execute_graphql_request(request, data, query, variables, operation_name,
+                                                         show_graphiql)
+                if batch.failed and batch.fail_fast:
+                    transaction.set_rollback(True)
+        finally:
+            delattr(request, MUTATION_BATCH_ATTR)
+
+        return result
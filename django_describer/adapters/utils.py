@@ -14,7 +14,7 @@ def register_non_model_action(name, action):
     non_model_actions.append(action)
 
 
-def generate(adapter):
-    return adapter().generate()
+def generate(adapter, **kwargs):
+    return adapter(**kwargs).generate()
 
 
@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+from django.db import connections, router
+from django.db.models import Max, Q, Func, BigIntegerField
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+
+_logged_models = set()  # models whose changes are logged
+
+
+def model_label(model):
+    return model._meta.label
+
+
+def current_txid():
+    """
+    Returns the id of the writing transaction as an expression on PostgreSQL, 0 elsewhere.
+    """
+    from .models import Change
+
+    if connections[router.db_for_write(Change)].vendor == "postgresql":
+        return Func(function="txid_current", output_field=BigIntegerField())
+    return 0
+
+
+def record_change(sender, instance, created=None, raw=False, **kwargs):
+    """
+    Appends a change of the instance to the log. Runs in the transaction of the change, so that a rollback discards
+    the entry as well. On PostgreSQL, the entry carries the id of the transaction, see get_changes.
+    """
+    from .models import Change
+
+    if raw:
+        return
+
+    if created is None:
+        kind = Change.DELETED
+    elif created:
+        kind = Change.CREATED
+    else:
+        kind = Change.UPDATED
+
+    Change.objects.create(model=model_label(sender), object_id=str(instance.pk), kind=kind, txid=current_txid())
+
+
+def record_changes(model, created_pks, updated_pks):
+    """
+    Appends changes of objects written without signals, e. g. by bulk upserts, to the log if the model has one.
+    """
+    from .models import Change
+
+    if model not in _logged_models:
+        return
+    txid = current_txid()
+    Change.objects.bulk_create(
+        [Change(model=model_label(model), object_id=str(pk), kind=Change.CREATED, txid=txid) for pk in created_pks] +
+        [Change(model=model_label(model), object_id=str(pk), kind=Change.UPDATED, txid=txid) for pk in updated_pks]
+    )
+
+
+def is_change_logged(model):
+    return model in _logged_models
+
+
+def connect_change_log(model):
+    _logged_models.add(model)
+    uid = "django_describer_changes_{}".format(model_label(model))
+    post_save.connect(record_change, sender=model, dispatch_uid=uid)
+    post_delete.connect(record_change, sender=model, dispatch_uid=uid)
+
+
+def parse_cursor(cursor):
+    """
+    Returns (transaction id, entry id) of a cursor, (0, 0) for None.
+    """
+    if not cursor:
+        return 0, 0
+    try:
+        txid, entry_id = cursor.split(":")
+        return int(txid), int(entry_id)
+    except ValueError:
+        raise ValueError("Invalid cursor.")
+
+
+def format_cursor(txid, entry_id):
+    return "{}:{}".format(txid, entry_id)
+
+
+def get_committed_filter(using, settle_time):
+    """
+    Returns a filter of entries whose transactions have finished, so that no entry can appear before them later. Ids
+    are assigned on INSERT but become visible on COMMIT, in another order under concurrent writers.
+
+    On PostgreSQL, these are the entries of transactions older than the oldest one in flight. SQLite runs one writer at
+    a time, so all visible entries qualify. Elsewhere, entries qualify settle_time seconds after their creation, thus
+    entries of transactions running longer may be missed.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+            return Q(txid__lt=cursor.fetchone()[0])
+    if connection.vendor == "sqlite":
+        return Q()
+    return Q(created_at__lte=timezone.now() - timedelta(seconds=settle_time))
+
+
+def get_changes(model, since=None, limit=1000, settle_time=10):
+    """
+    Returns the changes of objects after the cursor as (created ids, updated ids, deleted ids, new cursor, has more).
+    Each object is reported once, by its latest change. An object created after the cursor is reported as created even
+    if it has been updated since. Only entries of finished transactions are read (see get_committed_filter), ordered by
+    the transaction, so that the cursor never skips entries committed later.
+    """
+    from .models import Change
+
+    since_txid, since_id = parse_cursor(since)
+    using = router.db_for_read(Change)
+    entries = list(Change.objects.using(using).filter(
+        Q(txid__gt=since_txid) | Q(txid=since_txid, id__gt=since_id),
+        get_committed_filter(using, settle_time),
+        model=model_label(model),
+    ).order_by("txid", "id").values_list("txid", "id", "object_id", "kind")[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # changes of an object are serialized by its row lock, so their ids are in the order of the changes
+    kinds = {}  # key: object id, value: kind of the latest change
+    for _, _, object_id, kind in sorted(entries, key=lambda entry: entry[1]):
+        if kind == Change.UPDATED and kinds.get(object_id, None) == Change.CREATED:
+            kind = Change.CREATED
+        kinds.pop(object_id, None)
+        kinds[object_id] = kind
+
+    ret = {Change.CREATED: [], Change.UPDATED: [], Change.DELETED: []}
+    for object_id, kind in kinds.items():
+        ret[kind].append(object_id)
+
+    cursor = format_cursor(*entries[-1][:2]) if entries else format_cursor(since_txid, since_id)
+    return ret[Change.CREATED], ret[Change.UPDATED], ret[Change.DELETED], cursor, has_more
+
+
+def compact_changes(model=None):
+    """
+    Deletes all entries superseded by a later change (a higher id) of the same object. Returns the number of deleted
+    entries. Clients still get every object changed after their cursor, only possibly as updated rather than created.
+    """
+    from .models import Change
+
+    qs = Change.objects.all()
+    if model is not None:
+        qs = qs.filter(model=model_label(model))
+
+    latest = qs.values("model", "object_id").annotate(latest_id=Max("id")).values("latest_id")
+    deleted, _ = qs.exclude(id__in=latest).delete()
+    return deleted
@@ -0,0 +1,132 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Count, OuterRef, Subquery, IntegerField, ManyToOneRel
+from django.db.models.functions import Coalesce
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from .entities import invalidate_entities, invalidate_all_entities
+from .utils import get_model_meta
+
+
+class Counter:
+    """
+    Keeps the number of objects related by a reverse foreign key in an integer field of the parent model. The field is
+    updated by signals, so it is kept up to date by the generated mutations and by any other save() or delete().
+    Bulk operations and update() do not send signals, use recount() after them. The counter updates themselves send
+    no signals either, so they invalidate cached parent objects directly.
+
+    The relation is resolved lazily, once all models are loaded: by the first signal or when the schema is generated,
+    which reports misconfigured counters.
+    """
+
+    def __init__(self, model, relation, field):
+        self.model = model
+        self.relation = relation
+        self.field = field
+        self.related_model = None
+        self.attname = None
+        self.old_value_attr = None
+
+    def resolve(self):
+        if self.related_model is not None:
+            return self
+
+        model, relation, field = self.model, self.relation, self.field
+        related = get_model_meta(model).fields_by_name.get(relation, None)
+        if not isinstance(related, ManyToOneRel):
+            raise ValueError("`{}` is not a reverse foreign key of `{}`.".format(relation, model.__name__))
+        try:
+            model._meta.get_field(field)
+        except FieldDoesNotExist:
+            raise ValueError("`{}` has no field `{}`.".format(model.__name__, field))
+
+        self.attname = related.field.attname
+        self.old_value_attr = "_counter_old_{}".format(self.attname)
+        self.related_model = related.related_model
+        return self
+
+    def is_counted(self, sender):
+        """
+        Returns whether the sender is the counted model. A misconfigured counter counts nothing rather than failing
+        saves of all models, it is reported once the schema is generated.
+        """
+        try:
+            return sender is self.resolve().related_model
+        except ValueError:
+            return False
+
+    def add(self, pk, delta):
+        if pk is not None:
+            self.model._default_manager.filter(pk=pk).update(**{self.field: F(self.field) + delta})
+            invalidate_entities(self.model, (pk,))
+
+    def move(self, old_value, new_value):
+        """
+        Moves an object from the parent old_value to new_value, either of them may be None.
+        """
+        if old_value != new_value:
+            self.add(old_value, -1)
+            self.add(new_value, 1)
+
+    def pre_save(self, sender, instance, raw=False, **kwargs):
+        if not self.is_counted(sender) or raw or instance._state.adding or instance.pk is None:
+            return
+        old_value = self.related_model._default_manager.filter(pk=instance.pk).values_list(
+            self.attname, flat=True).first()
+        setattr(instance, self.old_value_attr, old_value)
+
+    def post_save(self, sender, instance, created, raw=False, **kwargs):
+        if not self.is_counted(sender) or raw:
+            return
+        new_value = getattr(instance, self.attname)
+        if created:
+            self.move(None, new_value)
+        else:
+            self.move(instance.__dict__.pop(self.old_value_attr, new_value), new_value)
+
+    def post_delete(self, sender, instance, **kwargs):
+        if not self.is_counted(sender):
+            return
+        self.add(getattr(instance, self.attname), -1)
+
+    def connect(self):
+        """
+        Connects the handlers to signals of all models, the related model is not known before the relation is resolved.
+        """
+        uid = "django_describer_counter_{}_{}_{}".format(self.model._meta.label, self.relation, self.field)
+        pre_save.connect(self.pre_save, weak=False, dispatch_uid=uid)
+        post_save.connect(self.post_save, weak=False, dispatch_uid=uid)
+        post_delete.connect(self.post_delete, weak=False, dispatch_uid=uid)
+
+    def recount(self):
+        """
+        Recomputes the field of all parent objects in a single query.
+        """
+        self.resolve()
+        counts = self.related_model._default_manager.filter(**{self.attname: OuterRef("pk")}).order_by().values(
+            self.attname).annotate(count=Count("pk")).values("count")
+        self.model._default_manager.update(**{
+            self.field: Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+        })
+        invalidate_all_entities(self.model)
+
+
+_all_counters = []
+
+
+def get_counters_of(related_model):
+    """
+    Returns the Counters counting objects of the related model.
+    """
+    return [counter for counter in _all_counters if counter.is_counted(related_model)]
+
+
+def build_counters(model, counter_fields):
+    """
+    Returns a dict of connected Counters, key: relation name, value: Counter. Their relations are not resolved yet.
+    """
+    counters = {}
+    for relation, field in (counter_fields or {}).items():
+        counters[relation] = Counter(model, relation, field)
+        counters[relation].connect()
+        _all_counters.append(counters[relation])
+    return counters
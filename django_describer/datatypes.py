@@ -4,9 +4,17 @@ from django.db.models import Model
 
 
 class Type:
-    def __init__(self, required=True, **kwargs):
+    """
+    expression: an ORM expression (e.g. Count, Subquery, F arithmetic or Case) computing the value of an extra field.
+    Such fields are annotated to the queryset when selected, instead of being read from a model property.
+    """
+
+    __slots__ = ("kwargs", "expression")
+
+    def __init__(self, required=True, expression=None, **kwargs):
         self.kwargs = kwargs
         self.kwargs["required"] = required
+        self.expression = expression
 
     def convert(self, to, **kwargs):
         raise NotImplementedError
@@ -17,6 +25,8 @@ class Type:
 
 
 class String(Type):
+    __slots__ = ()
+
     def convert(self, to, **kwargs):
         return to.string_type(self, **kwargs)
 
@@ -38,6 +48,8 @@ class String(Type):
 
 
 class Integer(Type):
+    __slots__ = ()
+
     def convert(self, to, **kwargs):
         return to.integer_type(self, **kwargs)
 
@@ -54,16 +66,22 @@ class Integer(Type):
 
 
 class Float(Type):
+    __slots__ = ()
+
     def convert(self, to, **kwargs):
         return to.float_type(self, **kwargs)
 
 
 class ID(Type):
+    __slots__ = ()
+
     def convert(self, to, **kwargs):
         return to.id_type(self, **kwargs)
 
 
 class Boolean(Type):
+    __slots__ = ()
+
     def convert(self, to, **kwargs):
         return to.boolean_type(self, **kwargs)
 
@@ -76,6 +94,8 @@ class Boolean(Type):
 
 
 class ModelType(Type):
+    __slots__ = ("model",)
+
     def __init__(self, model, **kwargs):
         self.model = model
         super().__init__(**kwargs)
@@ -88,8 +108,17 @@ model_type_mapping = {}  # key: Model, value: ModelType
 
 
 class QuerySet(Type):
-    def __init__(self, of_type, **kwargs):
+    """
+    A list of objects. If via (a relation name) is given, the objects are the related ones, optionally filtered by a Q
+    object. Such lists can be prefetched for all parent objects at once. Otherwise, they are read from a property.
+    """
+
+    __slots__ = ("of_type", "via", "filter")
+
+    def __init__(self, of_type, via=None, filter=None, **kwargs):
         self.of_type = of_type
+        self.via = via
+        self.filter = filter
         super().__init__(**kwargs)
 
     @property
@@ -105,6 +134,8 @@ class NullType(Type):
     Null object for types. convert() raises an exception. Useful when converting an unknown type for filters.
     """
 
+    __slots__ = ()
+
     def convert(self, to, **kwargs):
         raise ValueError("Trying to convert NullType.")
 
@@ -114,6 +145,8 @@ class CompositeType(Type):
     Technically, this is an Object type without Django model.
     """
 
+    __slots__ = ("type_name", "field_map")
+
     def __init__(self, type_name, field_map, **kwargs):
         super().__init__(**kwargs)
         self.type_name = type_name
@@ -2,6 +2,10 @@ from copy import deepcopy
 
 from .datatypes import model_type_mapping, ModelType
 from .utils import determine_fields, ensure_tuple, build_field_permissions, build_extra_fields
+from .changes import connect_change_log
+from .counters import build_counters
+from .entities import connect_entity_cache
+from .search import check_search_fields
 from .actions import ListAction, DetailAction, ActionName, CreateAction, UpdateAction, DeleteAction
 
 
@@ -9,6 +13,10 @@ def get_describers():
     return tuple(DescriberMeta.all_describers.values())
 
 
+def get_describer(model):
+    return DescriberMeta.all_describers.get(model, None)
+
+
 class DescriberMeta(type):
     all_describers = {}
     """
@@ -26,12 +34,23 @@ class DescriberMeta(type):
             # save the describer
             DescriberMeta.all_describers[cls.model] = cls
 
-            cls._fields = determine_fields(cls.model,
-                                           ensure_tuple(cls.only_fields, convert_none=False),
-                                           ensure_tuple(cls.exclude_fields, convert_none=False))
+            # fields are introspected lazily, once the schema is generated
             cls._field_permissions = build_field_permissions(cls.field_permissions)
             cls._default_field_permissions = ensure_tuple(cls.default_field_permissions)
             cls._default_action_permissions = ensure_tuple(cls.default_action_permissions)
+            cls._expensive_filters = {field: ensure_tuple(lookups)
+                                      for field, lookups in (cls.expensive_filters or {}).items()}
+            cls._expensive_ordering = ensure_tuple(cls.expensive_ordering)
+
+            if cls.search_fields is not None:
+                check_search_fields(cls.model, ensure_tuple(cls.search_fields))
+
+            # counters are maintained by signals, which have to be connected before any object is saved
+            cls._counters = build_counters(cls.model, cls.counter_fields)
+
+            # cached objects are invalidated by signals as well
+            if cls.cacheable:
+                connect_entity_cache(cls.model, cls.cache_timeout)
 
             cls._actions = []
 
@@ -47,6 +66,21 @@ class DescriberMeta(type):
                 cls.detail_action.set_name(ActionName.DETAIL.name)
                 cls._actions.append(cls.detail_action)
 
+            if cls.aggregate_action is not None:
+                cls.aggregate_action = deepcopy(cls.aggregate_action)
+                cls.aggregate_action.set_describer(cls)
+                cls.aggregate_action.set_name(ActionName.AGGREGATE.name)
+                cls._actions.append(cls.aggregate_action)
+
+            if cls.changes_action is not None:
+                cls.changes_action = deepcopy(cls.changes_action)
+                cls.changes_action.set_describer(cls)
+                cls.changes_action.set_name(ActionName.CHANGES.name)
+                cls._actions.append(cls.changes_action)
+
+                # the log has to be connected before any object is saved
+                connect_change_log(cls.model)
+
             if cls.create_action is not None:
                 cls.create_action = deepcopy(cls.create_action)
                 cls.create_action.set_describer(cls)
@@ -59,6 +93,12 @@ class DescriberMeta(type):
                 cls.update_action.set_name(ActionName.UPDATE.name)
                 cls._actions.append(cls.update_action)
 
+            if cls.upsert_action is not None:
+                cls.upsert_action = deepcopy(cls.upsert_action)
+                cls.upsert_action.set_describer(cls)
+                cls.upsert_action.set_name(ActionName.UPSERT.name)
+                cls._actions.append(cls.upsert_action)
+
             if cls.delete_action is not None:
                 cls.delete_action = deepcopy(cls.delete_action)
                 cls.delete_action.set_describer(cls)
@@ -82,6 +122,10 @@ class Describer(metaclass=DescriberMeta):
 
     @classmethod
     def get_fields(cls):
+        if "_fields" not in cls.__dict__:
+            cls._fields = determine_fields(cls.model,
+                                           ensure_tuple(cls.only_fields, convert_none=False),
+                                           ensure_tuple(cls.exclude_fields, convert_none=False))
         return cls._fields
 
     @classmethod
@@ -96,13 +140,42 @@ class Describer(metaclass=DescriberMeta):
     def get_default_action_permissions(cls):
         return cls._default_action_permissions
 
+    @classmethod
+    def get_expensive_filters(cls):
+        return cls._expensive_filters
+
+    @classmethod
+    def get_expensive_ordering(cls):
+        return cls._expensive_ordering
+
+    @classmethod
+    def get_counters(cls):
+        return {relation: counter.resolve() for relation, counter in cls._counters.items()}
+
+    @classmethod
+    def get_counter_field(cls, relation):
+        """
+        Returns the name of the field counting the objects of the relation, None if there is no such field.
+        """
+        counter = cls.get_counters().get(relation, None)
+        return counter.field if counter is not None else None
+
+    @classmethod
+    def get_search_fields(cls):
+        if "_search_fields" not in cls.__dict__:
+            cls._search_fields = ()
+            if cls.search_fields is not None:
+                cls._search_fields = determine_fields(cls.model, ensure_tuple(cls.search_fields), None,
+                                                      no_reverse=True)
+        return cls._search_fields
+
     @classmethod
     def get_actions(cls):
         return cls._actions
 
     @classmethod
     def get_extra_fields(cls):
-        if not hasattr(cls, "_extra_fields"):
+        if "_extra_fields" not in cls.__dict__:
             cls._extra_fields = build_extra_fields(cls.extra_fields)
         return cls._extra_fields
 
@@ -115,14 +188,31 @@ class Describer(metaclass=DescriberMeta):
     field_permissions = None
     default_field_permissions = None
 
+    search_fields = None
+    search_config = "english"
+
+    index_aware = False
+    expensive_filters = None
+    expensive_ordering = None
+
+    counter_fields = None
+
+    cacheable = False
+    cache_timeout = 300
+
     default_page_size = None
     max_page_size = None
+    max_unpaginated_rows = None
+    chunk_size = None
 
     list_action = ListAction()
     detail_action = DetailAction()
+    aggregate_action = None
+    changes_action = None
 
     create_action = CreateAction()
     update_action = UpdateAction()
+    upsert_action = None
     delete_action = DeleteAction()
 
     extra_actions = {}
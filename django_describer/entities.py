@@ -0,0 +1,127 @@
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.db import transaction, connections
+from django.db.models.signals import post_save, post_delete
+
+
+ENTITIES_ATTR = "_describer_entities"
+
+_cache_timeouts = {}  # key: cacheable model, value: timeout of its entities in the shared cache
+
+
+def get_identity_map(request):
+    """
+    Returns the objects loaded during the request, key: (model, pk, base_manager), value: object or None.
+    """
+    identity_map = getattr(request, ENTITIES_ATTR, None)
+    if identity_map is None:
+        identity_map = {}
+        setattr(request, ENTITIES_ATTR, identity_map)
+    return identity_map
+
+
+def entity_cache_key(model, pk, base_manager=False):
+    return "django_describer:entity:{}:{}:{}".format(model._meta.label, "base" if base_manager else "default", pk)
+
+
+def get_shared_cache():
+    return caches[DEFAULT_CACHE_ALIAS]
+
+
+def load_entities(request, model, pks, base_manager=False):
+    """
+    Returns a dict of objects by their pks, looking them up in the identity map of the request, then in the shared
+    cache if the model is cacheable, and fetching the rest by a single query. Missing objects are left out.
+    Objects are fetched by the default manager, or by the base manager like Django's related object access. Objects
+    fetched within a transaction are not written to the shared cache.
+    """
+    identity_map = get_identity_map(request)
+    ret = {}
+    missing = set()
+    for pk in pks:
+        key = (model, pk, base_manager)
+        if key in identity_map:
+            if identity_map[key] is not None:
+                ret[pk] = identity_map[key]
+        else:
+            missing.add(pk)
+
+    if missing and model in _cache_timeouts:
+        cached = get_shared_cache().get_many([entity_cache_key(model, pk, base_manager) for pk in missing])
+        for pk in list(missing):
+            obj = cached.get(entity_cache_key(model, pk, base_manager), None)
+            if obj is not None:
+                ret[pk] = identity_map[(model, pk, base_manager)] = obj
+                missing.remove(pk)
+
+    if missing:
+        manager = model._base_manager if base_manager else model._default_manager
+        fetched = manager.in_bulk(missing)
+        for pk in missing:
+            identity_map[(model, pk, base_manager)] = fetched.get(pk, None)
+        # rows read in a transaction may be uncommitted and rolled back later
+        if model in _cache_timeouts and fetched and not connections[manager.db].in_atomic_block:
+            get_shared_cache().set_many({entity_cache_key(model, pk, base_manager): obj
+                                         for pk, obj in fetched.items()}, timeout=_cache_timeouts[model])
+        ret.update(fetched)
+
+    return ret
+
+
+def load_entity(request, model, pk, base_manager=False):
+    """
+    Returns an object by its pk, or None if it does not exist. See load_entities.
+    """
+    pk = model._meta.pk.to_python(pk)
+    return load_entities(request, model, (pk,), base_manager=base_manager).get(pk, None)
+
+
+def forget_entities(request, model):
+    """
+    Removes objects of the model from the identity map of the request, e.g. once they are modified.
+    """
+    identity_map = get_identity_map(request)
+    for key in [key for key in identity_map if key[0] is model]:
+        del identity_map[key]
+
+
+def invalidate_entities(model, pks):
+    """
+    Removes objects from the shared cache, now and once the transaction commits, so that the old versions cached
+    meanwhile by other requests do not survive. Needed after writes sending no signals, e.g. update().
+    """
+    if model not in _cache_timeouts:
+        return
+    keys = [entity_cache_key(model, pk, base_manager) for pk in pks for base_manager in (False, True)]
+    if not keys:
+        return
+    get_shared_cache().delete_many(keys)
+    transaction.on_commit(lambda: get_shared_cache().delete_many(keys))
+
+
+def invalidate_all_entities(model, chunk_size=1000):
+    """
+    Removes all objects of the model from the shared cache, e.g. after an update() of all of them.
+    """
+    if model not in _cache_timeouts:
+        return
+    pks = []
+    for pk in model._base_manager.values_list("pk", flat=True).iterator(chunk_size=chunk_size):
+        pks.append(pk)
+        if len(pks) == chunk_size:
+            invalidate_entities(model, pks)
+            pks = []
+    invalidate_entities(model, pks)
+
+
+def invalidate_entity(sender, instance, **kwargs):
+    invalidate_entities(sender, (instance.pk,))
+
+
+def connect_entity_cache(model, timeout):
+    """
+    Makes objects of the model cached in the shared cache for timeout seconds.
+    """
+    _cache_timeouts[model] = timeout
+    uid = "django_describer_entities_{}".format(model._meta.label)
+    post_save.connect(invalidate_entity, sender=model, dispatch_uid=uid)
+    post_delete.connect(invalidate_entity, sender=model, dispatch_uid=uid)
@@ -0,0 +1,227 @@
+import datetime
+import json
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Model
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time, parse_duration
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobEncoder(DjangoJSONEncoder):
+    """
+    Encodes model instances by their pks, anything unknown by str().
+    """
+
+    def default(self, o):
+        if isinstance(o, Model):
+            return {"model": o._meta.label, "pk": o.pk}
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+TYPE_KEY = "__job_type__"
+
+
+class InputEncoder(json.JSONEncoder):
+    """
+    Encodes the input of a job, tagging values JSON has no type for, so that decode_input restores them and exec_fn
+    gets the same types as when executed synchronously. Other values are refused rather than turned into strings.
+    """
+
+    def default(self, o):
+        if isinstance(o, Model):
+            return {TYPE_KEY: "model", "model": o._meta.label, "pk": DjangoJSONEncoder().encode(o.pk)}
+        for name, types in (("datetime", datetime.datetime), ("date", datetime.date), ("time", datetime.time),
+                            ("timedelta", datetime.timedelta), ("decimal", Decimal), ("uuid", uuid.UUID)):
+            if isinstance(o, types):
+                return {TYPE_KEY: name, "value": DjangoJSONEncoder().default(o)}
+        return super().default(o)
+
+
+input_decoders = {
+    "datetime": parse_datetime,
+    "date": parse_date,
+    "time": parse_time,
+    "timedelta": parse_duration,
+    "decimal": Decimal,
+    "uuid": uuid.UUID,
+}
+
+
+def decode_tagged(d):
+    if TYPE_KEY not in d:
+        return d
+    if d[TYPE_KEY] == "model":
+        model = apps.get_model(d["model"])
+        return model._base_manager.filter(pk=json.loads(d["pk"])).first()
+    return input_decoders[d[TYPE_KEY]](d["value"])
+
+
+def encode_input(data):
+    return json.dumps(data, cls=InputEncoder)
+
+
+def decode_input(value):
+    """
+    Decodes the input of a job. Tuples come back as lists, deleted model instances as None.
+    """
+    return json.loads(value, object_hook=decode_tagged)
+
+
+class JobRequest:
+    """
+    Stands in for the request in exec_fn of a job, which runs outside of it.
+    """
+
+    def __init__(self, job, user=None):
+        self.job = job
+        self.user = user
+
+
+def get_job_action(name):
+    """
+    Returns the action of the given name, or None.
+    """
+    from .adapters.utils import non_model_actions
+    from .describers import get_describers
+
+    for describer in get_describers():
+        for action in describer.get_actions():
+            if action.get_name() == name:
+                return action
+    for action in non_model_actions:
+        if action.get_name() == name:
+            return action
+    return None
+
+
+def get_job_user(job):
+    if job.user_id is None:
+        return None
+    from django.contrib.auth import get_user_model
+    return get_user_model()._default_manager.filter(pk=job.user_id).first()
+
+
+def enqueue_job(request, action, data, obj=None, runner=None):
+    """
+    Stores a job executing the action's exec_fn, and submits it to the runner once the transaction commits.
+    Permissions have to be checked before.
+    """
+    from .models import Job
+
+    user = getattr(request, "user", None)
+    job = Job.objects.create(
+        action=action.get_name(),
+        user_id=str(user.pk) if user is not None and user.is_authenticated else None,
+        object_id=str(obj.pk) if obj is not None else None,
+        input=encode_input(data),
+    )
+    if runner is not None:
+        transaction.on_commit(lambda: runner.submit(job.pk))
+    return job
+
+
+def claim_job(job_id):
+    """
+    Marks a queued job as running. Returns False if another worker has claimed it.
+    """
+    from .models import Job
+
+    return Job.objects.filter(pk=job_id, status=Job.QUEUED).update(status=Job.RUNNING,
+                                                                   started_at=timezone.now()) == 1
+
+
+def run_job(job_id):
+    """
+    Executes a job unless it has been claimed by another worker, and stores its result or error, unless the job has
+    timed out meanwhile.
+    """
+    from .models import Job
+
+    if not claim_job(job_id):
+        return
+
+    job = Job.objects.get(pk=job_id)
+    try:
+        action = get_job_action(job.action)
+        if action is None:
+            raise ValueError("Unknown action: `{}`.".format(job.action))
+
+        request = JobRequest(job, user=get_job_user(job))
+        data = decode_input(job.input)
+        if job.object_id is not None:
+            obj = action.get_fetch_fn()(request, job.object_id)
+            result = action.get_exec_fn()(request, obj, data)
+        else:
+            result = action.get_exec_fn()(request, data)
+
+        job.result = json.dumps(result, cls=JobEncoder)
+        job.status = Job.SUCCEEDED
+    except Exception as e:
+        logger.exception("Job %s failed.", job.pk)
+        job.error = str(e)
+        job.status = Job.FAILED
+
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(result=job.result, error=job.error, status=job.status,
+                                                             finished_at=timezone.now())
+
+
+def fail_stale_jobs(timeout):
+    """
+    Fails jobs running for more than timeout seconds, e.g. since their worker has died. They are not run again, since
+    they may have had effects already. Returns the number of failed jobs.
+    """
+    from .models import Job
+
+    now = timezone.now()
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=now - datetime.timedelta(seconds=timeout)).update(
+        status=Job.FAILED, error="The job has timed out.", finished_at=now)
+
+
+def run_queued_jobs(limit=None, timeout=3600):
+    """
+    Runs queued jobs, the oldest first, failing the stale ones before. Returns the number of jobs run.
+    """
+    from .models import Job
+
+    fail_stale_jobs(timeout)
+    count = 0
+    while limit is None or count < limit:
+        job_id = Job.objects.filter(status=Job.QUEUED).order_by("created_at").values_list("pk", flat=True).first()
+        if job_id is None:
+            break
+        run_job(job_id)
+        count += 1
+    return count
+
+
+class JobRunner:
+    """
+    Runs jobs in a pool of threads of the web process. Jobs of a dead process fail once they exceed timeout seconds.
+    """
+
+    def __init__(self, workers=2, timeout=3600):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.timeout = timeout
+
+    def submit(self, job_id):
+        self.executor.submit(self.run, job_id)
+        fail_stale_jobs(self.timeout)
+
+    def run(self, job_id):
+        try:
+            run_job(job_id)
+        finally:
+            # connections are per thread
+            connections.close_all()
@@ -0,0 +1,72 @@
+import tracemalloc
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from graphene.utils.str_converters import to_camel_case
+
+from django_describer.adapters.graphql.main import GraphQL
+from django_describer.describers import get_describers
+from django_describer.utils import get_model_meta
+
+
+class Command(BaseCommand):
+    help = "Measures memory allocated per row by a list query selecting all plain fields of a describer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Name of the described model.")
+        parser.add_argument("--rows", type=int, default=100, help="Number of rows to fetch.")
+        parser.add_argument("--user", help="Primary key of the user to run the query as, anonymous by default.")
+
+    def get_describer(self, model_name):
+        for describer in get_describers():
+            if describer.model.__name__ == model_name:
+                return describer
+        raise CommandError("No describer for `{}` model.".format(model_name))
+
+    def build_query(self, describer, rows):
+        meta = get_model_meta(describer.model)
+        fields = [to_camel_case(name) for name in describer.get_fields() if not meta.fields_by_name[name].is_relation]
+        return "{{ {} {{ results(limit: {}) {{ {} }} }} }}".format(
+            to_camel_case(describer.list_action.get_name()), rows, " ".join(fields))
+
+    def handle(self, *args, **options):
+        # describers are usually imported by the URL configuration
+        import_module(settings.ROOT_URLCONF)
+
+        describer = self.get_describer(options["model"])
+        if describer.list_action is None:
+            raise CommandError("`{}` has no list action.".format(options["model"]))
+
+        schema = GraphQL().generate_schema()
+        query = self.build_query(describer, options["rows"])
+
+        request = RequestFactory().post("/")
+        if options["user"] is not None:
+            request.user = get_user_model().objects.get(pk=options["user"])
+        else:
+            request.user = AnonymousUser()
+
+        # warm up caches, so that only the per-request work is measured
+        result = schema.execute(query, context=request)
+        if result.errors:
+            raise CommandError(str(result.errors[0]))
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        result = schema.execute(query, context=request)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        statistics = after.compare_to(before, "filename")
+        blocks = sum(stat.count_diff for stat in statistics if stat.count_diff > 0)
+        rows = len(next(iter(result.data.values()))["results"]) or 1
+
+        self.stdout.write("Query: {}".format(query))
+        self.stdout.write("Rows: {}".format(rows))
+        self.stdout.write("Peak memory: {} B ({} B per row)".format(peak, peak // rows))
+        self.stdout.write("Retained blocks: {} ({:.1f} per row)".format(blocks, blocks / rows))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from django_describer.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = "Deletes change log entries superseded by a later change of the same object."
+
+    def handle(self, *args, **options):
+        deleted = compact_changes()
+        self.stdout.write("Deleted {} change log entries.".format(deleted))
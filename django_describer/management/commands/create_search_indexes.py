@@ -0,0 +1,44 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from django_describer.describers import get_describers
+from django_describer.search import search_index_sql
+
+
+class Command(BaseCommand):
+    help = "Creates full-text search indexes for describers with search_fields."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database to create the indexes in.")
+        parser.add_argument("--dry-run", action="store_true", help="Only print the SQL.")
+
+    def handle(self, *args, **options):
+        # describers are usually imported by the URL configuration
+        import_module(settings.ROOT_URLCONF)
+
+        connection = connections[options["database"]]
+
+        for describer in get_describers():
+            if not describer.get_search_fields():
+                continue
+
+            statements = search_index_sql(connection, describer.model, describer.get_search_fields(),
+                                          config=describer.search_config)
+            if not statements:
+                self.stderr.write("Full-text search indexes are not supported by `{}`, skipping `{}`.".format(
+                    connection.vendor, describer.model.__name__))
+                continue
+
+            if options["dry_run"]:
+                for sql, params in statements:
+                    self.stdout.write("{}; -- params: {}".format(sql, params) if params else "{};".format(sql))
+                continue
+
+            with connection.cursor() as cursor:
+                for sql, params in statements:
+                    cursor.execute(sql, params)
+
+            self.stdout.write("Created search index for `{}`.".format(describer.model.__name__))
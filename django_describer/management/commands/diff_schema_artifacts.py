@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_describer.adapters.graphql.artifacts import SchemaArtifact, diff_manifests
+
+
+class Command(BaseCommand):
+    help = "Prints differences between two schema artifacts written by export_schema_artifact."
+
+    def add_arguments(self, parser):
+        parser.add_argument("old", help="Directory of the old artifact.")
+        parser.add_argument("new", help="Directory of the new artifact.")
+        parser.add_argument("--fail-on-change", action="store_true", help="Exit with an error if there are changes.")
+
+    def handle(self, *args, **options):
+        old = SchemaArtifact.load(options["old"])
+        new = SchemaArtifact.load(options["new"])
+
+        differences = diff_manifests(old.manifest, new.manifest)
+        symbols = {"added": "+", "removed": "-", "changed": "~"}
+
+        for change, path, old_value, new_value in differences:
+            if change == "changed":
+                self.stdout.write("{} {}: {} -> {}".format(
+                    symbols[change], ".".join(path), json.dumps(old_value), json.dumps(new_value)))
+            else:
+                self.stdout.write("{} {}: {}".format(
+                    symbols[change], ".".join(path), json.dumps(old_value if new_value is None else new_value)))
+
+        if differences and options["fail_on_change"]:
+            raise CommandError("The schema artifacts differ.")
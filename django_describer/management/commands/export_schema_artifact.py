@@ -0,0 +1,36 @@
+import copy
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from django_describer.adapters.graphql.artifacts import export_artifact
+from django_describer.adapters.graphql.main import GraphQL
+
+
+class Command(BaseCommand):
+    help = "Writes the GraphQL schema SDL, those of the roles and a JSON manifest of all describers into a directory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory to write the artifact into.")
+        parser.add_argument("--adapter", default=getattr(settings, "DESCRIBER_GRAPHQL_ADAPTER", None),
+                            help="Dotted path of the project's GraphQL adapter, or of a function returning it. "
+                                 "Defaults to the DESCRIBER_GRAPHQL_ADAPTER setting, then to GraphQL().")
+
+    def handle(self, *args, **options):
+        # describers are usually imported by the URL configuration
+        import_module(settings.ROOT_URLCONF)
+
+        adapter = GraphQL()
+        if options["adapter"]:
+            adapter = import_string(options["adapter"])
+            if not isinstance(adapter, GraphQL):
+                adapter = adapter()
+
+        # the schema does not depend on job workers, none are started by the command
+        adapter = copy.copy(adapter)
+        adapter.job_workers = 0
+
+        export_artifact(adapter, options["directory"])
+        self.stdout.write("Schema artifact written to `{}`.".format(options["directory"]))
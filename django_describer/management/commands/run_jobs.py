@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+
+from django_describer.jobs import run_queued_jobs
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs of actions with async_exec."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once there are no queued jobs.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to wait for new jobs.")
+        parser.add_argument("--timeout", type=float, default=3600,
+                            help="Seconds after which running jobs are considered dead and failed.")
+
+    def handle(self, *args, **options):
+        # describers are registered once the URLconf is imported
+        get_resolver().url_patterns
+
+        while True:
+            count = run_queued_jobs(timeout=options["timeout"])
+            if count:
+                self.stdout.write("Ran {} jobs.".format(count))
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
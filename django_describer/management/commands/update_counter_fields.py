@@ -0,0 +1,19 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from django_describer.describers import get_describers
+
+
+class Command(BaseCommand):
+    help = "Recomputes the counter fields of all describers, e. g. after bulk operations."
+
+    def handle(self, *args, **options):
+        # describers are usually imported by the URL configuration
+        import_module(settings.ROOT_URLCONF)
+
+        for describer in get_describers():
+            for relation, counter in describer.get_counters().items():
+                counter.recount()
+                self.stdout.write("Recounted `{}.{}`.".format(describer.model.__name__, counter.field))
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("model", models.CharField(max_length=255)),
+                ("object_id", models.CharField(max_length=255)),
+                ("kind", models.CharField(choices=[("created", "created"), ("updated", "updated"),
+                                                   ("deleted", "deleted")], max_length=7)),
+                ("txid", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["model", "txid", "id"], name="describer_change_cursor"),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["model", "object_id"], name="describer_change_object"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_describer", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("action", models.CharField(max_length=255)),
+                ("status", models.CharField(choices=[("queued", "queued"), ("running", "running"),
+                                                     ("succeeded", "succeeded"), ("failed", "failed")],
+                                            default="queued", max_length=9)),
+                ("user_id", models.CharField(max_length=255, null=True)),
+                ("object_id", models.CharField(max_length=255, null=True)),
+                ("input", models.TextField()),
+                ("result", models.TextField(null=True)),
+                ("error", models.TextField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(null=True)),
+                ("finished_at", models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(fields=["status", "created_at"], name="describer_job_status"),
+        ),
+    ]
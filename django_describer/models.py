@@ -0,0 +1,66 @@
+import uuid
+
+from django.db import models
+
+
+class Change(models.Model):
+    """
+    Append-only log of created, updated and deleted objects of models whose describer has a changes action.
+    Cursors consist of the id of the writing transaction (on PostgreSQL, 0 elsewhere) and the id of the entry.
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    KINDS = (
+        (CREATED, "created"),
+        (UPDATED, "updated"),
+        (DELETED, "deleted"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=255)
+    object_id = models.CharField(max_length=255)
+    kind = models.CharField(max_length=7, choices=KINDS)
+    txid = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=("model", "txid", "id"), name="describer_change_cursor"),
+            models.Index(fields=("model", "object_id"), name="describer_change_object"),
+        )
+
+
+class Job(models.Model):
+    """
+    A call of an action's exec_fn executed in the background. The input and the result are stored as JSON.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "queued"),
+        (RUNNING, "running"),
+        (SUCCEEDED, "succeeded"),
+        (FAILED, "failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    action = models.CharField(max_length=255)
+    status = models.CharField(max_length=9, choices=STATUSES, default=QUEUED)
+    user_id = models.CharField(max_length=255, null=True)
+    object_id = models.CharField(max_length=255, null=True)
+    input = models.TextField()
+    result = models.TextField(null=True)
+    error = models.TextField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=("status", "created_at"), name="describer_job_status"),
+        )
@@ -1,17 +1,56 @@
-from django.utils.translation import ugettext_lazy as _
+from django.utils.translation import gettext_lazy as _
 
 from .utils import AttrDict
 
 
+_statements_cache = {}  # key: permission class, value: tuple of permission_statement functions
+
+
+def get_permission_statements(permission_class):
+    """
+    Returns the permission_statement functions of the class and its bases, the most basic first.
+    """
+    statements = _statements_cache.get(permission_class, None)
+    if statements is None:
+        statements = tuple(clas.permission_statement for clas in reversed(permission_class.__mro__)
+                           if clas not in (object, BasePermission, Permission, OrResolver))
+        _statements_cache[permission_class] = statements
+    return statements
+
+
 class BasePermission:
+    __slots__ = ()
+
+    # role keys the permission is granted to, if it depends on nothing but the role (see specialize_permissions)
+    roles = None
+
+    @classmethod
+    def role_statement(cls, role):
+        """
+        Returns whether the permission is granted to the role, or None if it has to be checked at runtime. Like in
+        has_permission, the permission_statement of each class of the MRO counts. It is known statically only if the
+        class declares roles next to it, or it is the one of AllowAll or AllowNone.
+        """
+        granted = True
+        for clas in cls.__mro__:
+            if "permission_statement" not in clas.__dict__ or clas in (BasePermission, Permission, OrResolver):
+                continue
+            if clas is AllowNone:
+                return False
+            if clas is AllowAll:
+                continue
+            if clas.__dict__.get("roles", None) is None or cls.roles is None:
+                granted = None
+            elif role not in cls.roles:
+                return False
+        return granted
+
     def permission_statement(self):
         raise NotImplementedError
 
     def has_permission(self):
-        for clas in reversed(self.__class__.__mro__):
-            if clas in (object, BasePermission, Permission, OrResolver):
-                continue
-            if not clas.permission_statement(self):
+        for statement in get_permission_statements(self.__class__):
+            if not statement(self):
                 return False
         return True
 
@@ -20,21 +59,34 @@ class BasePermission:
 
 
 class Permission(BasePermission):
+    """
+    Permissions are instantiated per checked object, data is wrapped into an AttrDict only once it is accessed.
+    """
+
+    __slots__ = ("request", "obj", "_data", "qs")
+
     def __init__(self, request, obj=None, data=None, qs=None):
         self.request = request
         self.obj = obj
+        self._data = data
+        self.qs = qs
 
-        if data is None:
-            self.data = AttrDict()
-        elif isinstance(data, dict):
-            self.data = AttrDict(data)
-        else:
-            self.data = data
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = AttrDict()
+        elif isinstance(self._data, dict) and not isinstance(self._data, AttrDict):
+            self._data = AttrDict(self._data)
+        return self._data
 
-        self.qs = qs
+    @data.setter
+    def data(self, value):
+        self._data = value
 
 
 class OrResolver(Permission):
+    __slots__ = ("permission_classes", "errors")
+
     def __init__(self, permission_classes, request, obj=None, data=None, qs=None):
         super().__init__(request=request, obj=obj, data=data, qs=qs)
         self.permission_classes = permission_classes
@@ -42,7 +94,7 @@ class OrResolver(Permission):
 
     def has_permission(self):
         for permission_class in self.permission_classes:
-            pc = permission_class(self.request, obj=self.obj, data=self.data, qs=self.qs)
+            pc = permission_class(self.request, obj=self.obj, data=self._data, qs=self.qs)
             if pc.has_permission():
                 return True
             self.errors.append(pc.error_message())
@@ -59,26 +111,60 @@ class OrResolver(Permission):
 
 
 class Or:
+    __slots__ = ("permissions",)
+
     def __init__(self, *permissions):
         self.permissions = permissions
 
     def __call__(self, request, obj=None, data=None, qs=None):
         return OrResolver(self.permissions, request, obj=obj, data=data, qs=qs)
 
+    def role_statement(self, role):
+        statements = [permission.role_statement(role) for permission in self.permissions]
+        if True in statements:
+            return True
+        if all(statement is False for statement in statements):
+            return False
+        return None
+
 
 class AllowAll(Permission):
+    __slots__ = ()
+
     def permission_statement(self):
         return True
 
 
 class AllowNone(Permission):
+    __slots__ = ()
+
     def permission_statement(self):
         return False
 
 
 class IsAuthenticated(Permission):
+    __slots__ = ()
+
     def permission_statement(self):
         return self.request.user and self.request.user.is_authenticated
 
     def error_message(self):
         return _("Log in to access this.")
+
+
+def specialize_permissions(permission_classes, role):
+    """
+    Resolves the permissions which depend only on the role. Returns None if the role is denied, otherwise the
+    permissions which still have to be checked at runtime. Nothing is resolved for role None.
+    """
+    if role is None:
+        return permission_classes
+
+    remaining = []
+    for permission_class in permission_classes:
+        granted = permission_class.role_statement(role)
+        if granted is False:
+            return None
+        if granted is None:
+            remaining.append(permission_class)
+    return tuple(remaining)
@@ -0,0 +1,142 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q, FloatField
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_RANK = "search_rank"
+
+
+def check_search_fields(model, fields):
+    """
+    Search fields are indexed and searched by their columns, they have to be concrete non-relation fields.
+    """
+    for name in fields:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError("`{}` has no search field `{}`.".format(model.__name__, name))
+        if not field.concrete or field.is_relation or field.column is None:
+            raise ValueError("Search field `{}` of `{}` is not a concrete non-relation field.".format(
+                name, model.__name__))
+
+
+def _columns(model, fields):
+    return tuple(model._meta.get_field(field).column for field in fields)
+
+
+def _search_table(model):
+    return "{}_search".format(model._meta.db_table)
+
+
+def _postgresql_vector(connection, model, fields, qualified):
+    """
+    The very same expression is used for the index and for searching, so that the planner can use the index.
+    """
+    qn = connection.ops.quote_name
+    columns = []
+    for column in _columns(model, fields):
+        if qualified:
+            column = "{}.{}".format(qn(model._meta.db_table), qn(column))
+        else:
+            column = qn(column)
+        columns.append("COALESCE(({})::text, '')".format(column))
+    return "to_tsvector(%s::regconfig, {})".format(" || ' ' || ".join(columns))
+
+
+def _fts5_query(query):
+    # quote each term so that user input is never interpreted as FTS5 query syntax
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+def search_queryset(qs, fields, query, config="english"):
+    """
+    Filters the queryset by a full-text query and orders it by rank, best match first. PostgreSQL uses a GIN index on
+    to_tsvector() of the fields, SQLite uses an FTS5 table kept up to date by triggers (see search_index_sql).
+    Other databases fall back to icontains.
+    """
+    model = qs.model
+    connection = connections[qs.db]
+    qn = connection.ops.quote_name
+    pk = "{}.{}".format(qn(model._meta.db_table), qn(model._meta.pk.column))
+
+    if connection.vendor == "postgresql":
+        vector = _postgresql_vector(connection, model, fields, qualified=True)
+        ts_query = "plainto_tsquery(%s::regconfig, %s)"
+        return qs.extra(where=["{} @@ {}".format(vector, ts_query)], params=[config, config, query]).annotate(**{
+            SEARCH_RANK: RawSQL("ts_rank({}, {})".format(vector, ts_query), (config, config, query),
+                                output_field=FloatField())
+        }).order_by("-{}".format(SEARCH_RANK))
+
+    if connection.vendor == "sqlite":
+        table = qn(_search_table(model))
+        fts_query = _fts5_query(query)
+        if not fts_query:
+            return qs
+        return qs.extra(where=["{} IN (SELECT rowid FROM {} WHERE {} MATCH %s)".format(pk, table, table)],
+                        params=[fts_query]).annotate(**{
+            SEARCH_RANK: RawSQL("SELECT -bm25({t}) FROM {t} WHERE {t} MATCH %s AND rowid = {pk}".format(
+                t=table, pk=pk), (fts_query,), output_field=FloatField())
+        }).order_by("-{}".format(SEARCH_RANK))
+
+    condition = Q()
+    for term in query.split():
+        term_condition = Q()
+        for field in fields:
+            term_condition |= Q(**{"{}__icontains".format(field): term})
+        condition &= term_condition
+    return qs.filter(condition)
+
+
+def search_index_sql(connection, model, fields, config="english"):
+    """
+    Returns a list of (sql, params) creating the search index of the model. Empty for unsupported databases.
+    """
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+
+    if connection.vendor == "postgresql":
+        vector = _postgresql_vector(connection, model, fields, qualified=False)
+        return [(
+            "CREATE INDEX IF NOT EXISTS {} ON {} USING GIN ({})".format(
+                qn("{}_search_idx".format(table)), qn(table), vector),
+            [config],
+        )]
+
+    if connection.vendor == "sqlite":
+        search_table = _search_table(model)
+        pk = model._meta.pk.column
+        columns = ", ".join(qn(column) for column in _columns(model, fields))
+        new_values = ", ".join("new.{}".format(qn(column)) for column in _columns(model, fields))
+        old_values = ", ".join("old.{}".format(qn(column)) for column in _columns(model, fields))
+        names = {
+            "search_table": qn(search_table),
+            "table": qn(table),
+            "raw_table": table,
+            "pk": qn(pk),
+            "raw_pk": pk,
+            "columns": columns,
+            "new_values": new_values,
+            "old_values": old_values,
+        }
+        statements = [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS {search_table} USING fts5({columns}, content='{raw_table}', "
+            "content_rowid='{raw_pk}')",
+            "CREATE TRIGGER IF NOT EXISTS {ai} AFTER INSERT ON {table} BEGIN "
+            "INSERT INTO {search_table}(rowid, {columns}) VALUES (new.{pk}, {new_values}); END",
+            "CREATE TRIGGER IF NOT EXISTS {ad} AFTER DELETE ON {table} BEGIN "
+            "INSERT INTO {search_table}({search_table}, rowid, {columns}) VALUES ('delete', old.{pk}, {old_values}); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS {au} AFTER UPDATE ON {table} BEGIN "
+            "INSERT INTO {search_table}({search_table}, rowid, {columns}) VALUES ('delete', old.{pk}, {old_values}); "
+            "INSERT INTO {search_table}(rowid, {columns}) VALUES (new.{pk}, {new_values}); END",
+            "INSERT INTO {search_table}({search_table}) VALUES ('rebuild')",
+        ]
+        triggers = {
+            "ai": qn("{}_ai".format(search_table)),
+            "ad": qn("{}_ad".format(search_table)),
+            "au": qn("{}_au".format(search_table)),
+        }
+        return [(statement.format(**names, **triggers), []) for statement in statements]
+
+    return []
@@ -0,0 +1,22 @@
+"""
+Settings of the test suite, run by `python -m django test django_describer.tests
+--settings=django_describer.tests.settings`.
+"""
+
+SECRET_KEY = "django_describer-tests"
+INSTALLED_APPS = [
+    "django.contrib.contenttypes",
+    "django.contrib.auth",
+    "graphene_django",
+    "django_describer",
+    "django_describer.tests.testapp",
+]
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
+MIDDLEWARE = []
+ROOT_URLCONF = "django_describer.tests.urls"
+USE_TZ = True
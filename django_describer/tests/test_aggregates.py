@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from django_describer.actions import AggregateAction
+
+from .testapp.describers import BookDescriber, PublisherDescriber, TagDescriber
+
+
+def bound_action(describer, **kwargs):
+    action = AggregateAction(**kwargs)
+    action.set_describer(describer)
+    return action
+
+
+class AggregateFieldsTest(SimpleTestCase):
+    def test_default_fields(self):
+        self.assertEqual(bound_action(BookDescriber).determine_fields(), ("page_count",))
+        self.assertEqual(bound_action(TagDescriber).determine_fields(), ("weight",))
+
+    def test_explicit_fields(self):
+        self.assertEqual(bound_action(TagDescriber, fields="weight").determine_fields(), ("weight",))
+
+        with self.assertRaisesMessage(ValueError, "`name` of `Tag` is not numeric"):
+            bound_action(TagDescriber, fields=("weight", "name")).determine_fields()
+
+        with mock.patch.object(PublisherDescriber, "get_fields", return_value=("id", "name")), \
+                self.assertRaisesMessage(ValueError, "`book_count` of `Publisher` is not exposed"):
+            bound_action(PublisherDescriber, fields="book_count").determine_fields()
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from django_describer.adapters.graphql.artifacts import SchemaArtifact
+from django_describer.adapters.graphql.main import GraphQL
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+
+
+adapter = GraphQL(roles=("viewer",), incremental_delivery=True)
+
+
+class ExportSchemaArtifactTest(SimpleTestCase):
+    def export(self, *args):
+        directory = tempfile.mkdtemp()
+        with mock.patch("django_describer.adapters.graphql.main.JobRunner") as job_runner_class:
+            call_command("export_schema_artifact", directory, *args, stdout=open(os.devnull, "w"))
+        self.assertFalse(job_runner_class.called)
+        return directory
+
+    def test_project_adapter(self):
+        directory = self.export("--adapter", "django_describer.tests.test_artifacts.adapter")
+
+        with open(os.path.join(directory, "schema.json")) as f:
+            self.assertEqual(json.load(f)["roles"], {"viewer": "schema.viewer.graphql"})
+
+        artifact = SchemaArtifact.load(directory)
+        self.assertEqual(artifact.validate("{ BookList { results @stream(initialCount: 1) { name } } }"), [])
+        self.assertEqual(artifact.validate('{ job(id: "1") { status } }'), [])
+        self.assertEqual(artifact.validate("{ TagList { results { color } } }"), [])
+
+        viewer = SchemaArtifact.load(directory, role="viewer")
+        self.assertNotEqual(viewer.validate("{ TagList { results { color } } }"), [])
+        self.assertEqual(viewer.validate("{ TagList { results { name } } }"), [])
+        self.assertIsNone(adapter.job_runner)
+
+    def test_default_adapter(self):
+        directory = self.export()
+        artifact = SchemaArtifact.load(directory)
+        self.assertNotEqual(artifact.validate("{ BookList { results @stream(initialCount: 1) { name } } }"), [])
@@ -0,0 +1,57 @@
+from django.test import TestCase
+
+from django_describer.changes import compact_changes, get_changes
+from django_describer.models import Change
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+from .testapp.models import Book
+
+
+class ChangesTest(TestCase):
+    def setUp(self):
+        self.first = Book.objects.create(name="First")
+        self.second = Book.objects.create(name="Second")
+        self.first.name = "First edition"
+        self.first.save()
+        second_pk = self.second.pk
+        self.second.delete()
+        self.second.pk = second_pk
+        self.third = Book.objects.create(name="Third")
+
+    def get_changes(self, since=None, limit=1000):
+        return get_changes(Book, since=since, limit=limit, settle_time=0)
+
+    def test_get_changes(self):
+        created, updated, deleted, cursor, has_more = self.get_changes()
+        self.assertEqual(created, [str(self.first.pk), str(self.third.pk)])
+        self.assertEqual((updated, deleted), ([], [str(self.second.pk)]))
+        self.assertEqual(cursor, "0:{}".format(Change.objects.latest("id").pk))
+        self.assertFalse(has_more)
+
+        self.first.save()
+        self.assertEqual(self.get_changes(since=cursor)[:3], ([], [str(self.first.pk)], []))
+
+    def test_paging(self):
+        created, updated, deleted, cursor, has_more = self.get_changes(limit=3)
+        self.assertEqual((created, updated, deleted), ([str(self.second.pk), str(self.first.pk)], [], []))
+        self.assertTrue(has_more)
+
+        created, updated, deleted, cursor, has_more = self.get_changes(since=cursor, limit=3)
+        self.assertEqual((created, updated, deleted), ([str(self.third.pk)], [], [str(self.second.pk)]))
+        self.assertFalse(has_more)
+
+        # nothing new after the last cursor
+        self.assertEqual(self.get_changes(since=cursor), ([], [], [], cursor, False))
+
+    def test_invalid_cursor(self):
+        with self.assertRaisesMessage(ValueError, "Invalid cursor."):
+            self.get_changes(since="abc")
+
+    def test_compact_changes(self):
+        self.assertEqual(compact_changes(Book), 2)
+        self.assertEqual(Change.objects.filter(model="testapp.Book").count(), 3)
+
+        # the creation of the first book has been compacted away
+        created, updated, deleted, _, _ = self.get_changes()
+        self.assertEqual((created, updated, deleted),
+                         ([str(self.third.pk)], [str(self.first.pk)], [str(self.second.pk)]))
@@ -0,0 +1,49 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.test import TestCase
+
+from django_describer.counters import Counter
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+from .testapp.models import Publisher, Book
+
+
+class CounterTest(TestCase):
+    def setUp(self):
+        self.first = Publisher.objects.create(name="First")
+        self.second = Publisher.objects.create(name="Second")
+
+    def assertBookCounts(self, first, second):
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.book_count, self.second.book_count), (first, second))
+
+    def test_signals(self):
+        book = Book.objects.create(name="A", publisher=self.first)
+        Book.objects.create(name="B", publisher=self.first)
+        self.assertBookCounts(2, 0)
+
+        book.publisher = self.second
+        book.save()
+        self.assertBookCounts(1, 1)
+
+        book.delete()
+        self.assertBookCounts(1, 0)
+
+    def test_recount(self):
+        Book.objects.bulk_create([Book(name="A", publisher=self.first), Book(name="B", publisher=self.second)])
+        self.assertBookCounts(0, 0)
+        describers.PublisherDescriber.get_counters()["books"].recount()
+        self.assertBookCounts(1, 1)
+
+    def test_misconfigured_counter_fails_only_when_resolved(self):
+        counter = Counter(Publisher, "nope", "book_count")
+        counter.connect()
+        try:
+            Book.objects.create(name="A", publisher=self.first)
+            Publisher.objects.create(name="Third")
+            with self.assertRaises(ValueError):
+                counter.resolve()
+        finally:
+            uid = "django_describer_counter_testapp.Publisher_nope_book_count"
+            for signal in (pre_save, post_save, post_delete):
+                signal.disconnect(dispatch_uid=uid)
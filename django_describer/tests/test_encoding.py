@@ -0,0 +1,16 @@
+from django.test import SimpleTestCase
+
+from django_describer.adapters.graphql.encoding import negotiate_compression
+
+
+class CompressionNegotiationTest(SimpleTestCase):
+    def test_negotiate_compression(self):
+        self.assertEqual(negotiate_compression("gzip, deflate", ("br", "gzip")), "gzip")
+        self.assertEqual(negotiate_compression("br;q=0.5, gzip", ("br", "gzip")), "br")
+        self.assertEqual(negotiate_compression("*", ("br", "gzip")), "br")
+        self.assertEqual(negotiate_compression("identity", ("gzip",)), None)
+
+    def test_excluded_codings_are_not_matched_by_wildcard(self):
+        self.assertEqual(negotiate_compression("*, gzip;q=0", ("gzip",)), None)
+        self.assertEqual(negotiate_compression("*, br;q=0", ("br", "gzip")), "gzip")
+        self.assertEqual(negotiate_compression("gzip;q=0", ("gzip",)), None)
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from django_describer.entities import load_entity, get_shared_cache, entity_cache_key
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+from .testapp.models import Publisher
+
+
+class Request:
+    pass
+
+
+class SharedCacheTest(TransactionTestCase):
+    def setUp(self):
+        get_shared_cache().clear()
+        self.publisher = Publisher.objects.create(name="P")
+
+    def test_cached_outside_transaction(self):
+        load_entity(Request(), Publisher, self.publisher.pk)
+        self.assertIsNotNone(get_shared_cache().get(entity_cache_key(Publisher, self.publisher.pk)))
+
+    def test_not_cached_in_rolled_back_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Publisher.objects.filter(pk=self.publisher.pk).update(name="uncommitted")
+                self.assertEqual(load_entity(Request(), Publisher, self.publisher.pk).name, "uncommitted")
+                raise RuntimeError
+
+        self.assertIsNone(get_shared_cache().get(entity_cache_key(Publisher, self.publisher.pk)))
+        self.assertEqual(load_entity(Request(), Publisher, self.publisher.pk).name, "P")
@@ -0,0 +1,83 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, RequestFactory
+
+from django_describer.adapters.graphql.incremental import plan_incremental_delivery
+from django_describer.adapters.graphql.main import GraphQL
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+from .testapp.models import Publisher, Book
+
+
+class IncrementalDeliveryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        publisher = Publisher.objects.create(name="P")
+        for i in range(4):
+            Book.objects.create(name="B{}".format(i), page_count=i, publisher=publisher)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        adapter = GraphQL(incremental_delivery=True, job_workers=0)
+        cls.view = staticmethod(adapter.generate())
+        cls.schema = adapter.generate_schema()
+
+    def execute(self, query, variables=None):
+        request = RequestFactory().post("/graphql/", json.dumps({"query": query, "variables": variables}),
+                                        content_type="application/json", HTTP_ACCEPT="multipart/mixed")
+        request.user = AnonymousUser()
+        response = self.view(request)
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(body.endswith("\r\n-----\r\n"))
+        parts = body[:-len("\r\n-----\r\n")].split("\r\n---\r\n")[1:]
+        return [json.loads(part.split("\r\n\r\n", 1)[1]) for part in parts]
+
+    def test_plan(self):
+        plan = plan_incremental_delivery(
+            self.schema, "{ BookList { results(ordering: [id_ASC]) @stream(initialCount: 1) { name } } }", None, None)
+        self.assertIn("limit: 1", plan.query)
+        self.assertEqual(len(plan.parts), 1)
+        self.assertEqual(plan.parts[0].kind, "stream")
+        self.assertEqual(plan.parts[0].start, 1)
+        self.assertIn("offset: 1", plan.parts[0].query)
+
+    def test_not_incremental(self):
+        self.assertIsNone(plan_incremental_delivery(self.schema, "{ BookList { totalCount } }", None, None))
+
+    def test_stream(self):
+        payloads = self.execute("{ BookList { results(ordering: [id_ASC]) @stream(initialCount: 1) { name } } }")
+        self.assertEqual(payloads[0]["data"]["BookList"]["results"], [{"name": "B0"}])
+        self.assertEqual(payloads[1]["incremental"], [
+            {"items": [{"name": "B1"}, {"name": "B2"}, {"name": "B3"}], "path": ["BookList", "results", 1]},
+        ])
+        self.assertFalse(payloads[-1]["hasNext"])
+
+    def test_defer(self):
+        payloads = self.execute(
+            "{ PublisherList { results { name ... on PublisherType @defer(label: \"d\") { bookCount } } } }")
+        self.assertEqual(payloads[0]["data"]["PublisherList"]["results"], [{"name": "P"}])
+        self.assertEqual(payloads[1]["incremental"], [
+            {"data": {"bookCount": 4}, "path": ["PublisherList", "results", 0], "label": "d"},
+        ])
+
+    def test_defer_inside_stream(self):
+        query = "{ BookList { results(ordering: [id_ASC]) @stream(initialCount: 2) { " \
+                "name ... on BookType @defer { pageCount } } } }"
+        plan = plan_incremental_delivery(self.schema, query, None, None)
+        defer_part = next(part for part in plan.parts if part.kind == "defer")
+        self.assertIn("limit: 2", defer_part.query)
+
+        payloads = self.execute(query)
+        self.assertEqual(payloads[0]["data"]["BookList"]["results"], [{"name": "B0"}, {"name": "B1"}])
+        entries = [entry for payload in payloads[1:] for entry in payload["incremental"]]
+        deferred = [entry for entry in entries if "data" in entry]
+        self.assertEqual([entry["path"] for entry in deferred],
+                         [["BookList", "results", 0], ["BookList", "results", 1]])
+        streamed = [entry for entry in entries if "items" in entry]
+        self.assertEqual(streamed, [{
+            "items": [{"name": "B2", "pageCount": 2}, {"name": "B3", "pageCount": 3}],
+            "path": ["BookList", "results", 2],
+        }])
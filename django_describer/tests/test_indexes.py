@@ -0,0 +1,25 @@
+from django.db import models
+from django.test import SimpleTestCase
+
+from django_describer.utils import get_indexed_field_names
+
+
+class Edition(models.Model):
+    number = models.IntegerField()
+    year = models.IntegerField()
+    isbn = models.CharField(max_length=20)
+    title = models.CharField(max_length=100)
+    reprint = models.BooleanField(default=False)
+
+    class Meta:
+        app_label = "testapp"
+        index_together = (("year", "number"),)
+        indexes = [models.Index(fields=["title"], name="edition_title_reprint", condition=models.Q(reprint=True))]
+        constraints = [
+            models.UniqueConstraint(fields=["isbn"], name="edition_isbn_unique", condition=models.Q(reprint=False)),
+        ]
+
+
+class IndexedFieldsTest(SimpleTestCase):
+    def test_partial_indexes_are_skipped(self):
+        self.assertEqual(get_indexed_field_names(Edition), {"id", "year"})
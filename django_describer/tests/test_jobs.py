@@ -0,0 +1,80 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from django_describer.jobs import claim_job, decode_input, encode_input, fail_stale_jobs, run_queued_jobs
+from django_describer.models import Job
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+from .testapp.models import Book
+
+
+class InputEncodingTest(TestCase):
+    def test_round_trip(self):
+        book = Book.objects.create(name="A")
+        data = {
+            "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5, 6000, tzinfo=datetime.timezone.utc),
+            "date": datetime.date(2020, 1, 2),
+            "time": datetime.time(3, 4, 5),
+            "timedelta": datetime.timedelta(days=1, seconds=2),
+            "decimal": Decimal("1.10"),
+            "uuid": uuid.uuid4(),
+            "book": book,
+            "nested": [{"date": datetime.date(2021, 5, 6)}, 1, "text", None],
+        }
+        self.assertEqual(decode_input(encode_input(data)), data)
+
+    def test_deleted_instance(self):
+        book = Book.objects.create(name="A")
+        value = encode_input({"book": book})
+        book.delete()
+        self.assertEqual(decode_input(value), {"book": None})
+
+    def test_unknown_type(self):
+        with self.assertRaises(TypeError):
+            encode_input({"value": object()})
+
+
+class JobTest(TestCase):
+    def create_job(self, **kwargs):
+        return Job.objects.create(action="Book_rename", input=encode_input({"name": "B"}), **kwargs)
+
+    def test_claim_job(self):
+        job = self.create_job()
+        self.assertTrue(claim_job(job.pk))
+        self.assertFalse(claim_job(job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertIsNotNone(job.started_at)
+
+    def test_fail_stale_jobs(self):
+        stale = self.create_job(status=Job.RUNNING, started_at=timezone.now() - datetime.timedelta(seconds=120))
+        running = self.create_job(status=Job.RUNNING, started_at=timezone.now())
+        queued = self.create_job()
+
+        self.assertEqual(fail_stale_jobs(60), 1)
+        for job in (stale, running, queued):
+            job.refresh_from_db()
+        self.assertEqual((stale.status, running.status, queued.status), (Job.FAILED, Job.RUNNING, Job.QUEUED))
+        self.assertEqual(stale.error, "The job has timed out.")
+
+    def test_run_queued_jobs(self):
+        book = Book.objects.create(name="A")
+        job = self.create_job(object_id=str(book.pk))
+        unknown = Job.objects.create(action="Book_unknown", input=encode_input({}))
+
+        with self.assertLogs("django_describer.jobs", "ERROR"):
+            self.assertEqual(run_queued_jobs(), 2)
+
+        book.refresh_from_db()
+        job.refresh_from_db()
+        unknown.refresh_from_db()
+        self.assertEqual(book.name, "B")
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(json.loads(job.result), {"object": {"model": "testapp.Book", "pk": book.pk}})
+        self.assertEqual((unknown.status, unknown.error), (Job.FAILED, "Unknown action: `Book_unknown`."))
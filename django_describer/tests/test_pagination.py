@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from django_describer.adapters.graphql.pagination import Ordering
+
+from .testapp.models import Book
+
+
+class OrderingTest(TestCase):
+    def setUp(self):
+        self.ordering = Ordering("BookTestOrdering", ("isbn", "page_count"), unique_fields=("pk",))
+        self.books = [
+            Book.objects.create(name="A", isbn="2", page_count=10),
+            Book.objects.create(name="B", isbn=None, page_count=10),
+            Book.objects.create(name="C", isbn="1", page_count=10),
+            Book.objects.create(name="D", isbn=None, page_count=20),
+        ]
+
+    def assertSameOrder(self, values, names):
+        listed = self.ordering.order_list(reversed(self.books), values)
+        queried = self.ordering.order_queryset(Book.objects.all(), values)
+        self.assertEqual([book.name for book in listed], names)
+        self.assertEqual([book.name for book in queried], names)
+
+    def test_none_first_in_both_directions(self):
+        self.assertSameOrder(["isbn"], ["B", "D", "C", "A"])
+        self.assertSameOrder(["-isbn"], ["B", "D", "A", "C"])
+
+    def test_pk_tiebreaker(self):
+        self.assertSameOrder(["page_count"], ["A", "B", "C", "D"])
+        self.assertSameOrder(["-page_count"], ["D", "A", "B", "C"])
@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from django_describer.permissions import Permission, AllowAll, AllowNone, Or, specialize_permissions
+
+
+class IsEditor(Permission):
+    roles = ("editor",)
+
+    def permission_statement(self):
+        return self.request.role in self.roles
+
+
+class IsOwnerEditor(IsEditor):
+    def permission_statement(self):
+        return self.obj.owner == self.request.user
+
+
+class IsEditorOrAdmin(IsEditor):
+    roles = ("editor", "admin")
+
+    def permission_statement(self):
+        return self.request.role in self.roles
+
+
+class AllowOwner(AllowAll):
+    def permission_statement(self):
+        return self.obj.owner == self.request.user
+
+
+class Request:
+    def __init__(self, role, user):
+        self.role = role
+        self.user = user
+
+
+class Obj:
+    def __init__(self, owner):
+        self.owner = owner
+
+
+class RoleStatementTest(TestCase):
+    def test_role_only(self):
+        self.assertIs(IsEditor.role_statement("editor"), True)
+        self.assertIs(IsEditor.role_statement("viewer"), False)
+        self.assertIs(IsEditorOrAdmin.role_statement("admin"), True)
+        self.assertIs(AllowAll.role_statement("viewer"), True)
+        self.assertIs(AllowNone.role_statement("editor"), False)
+
+    def test_subclass_with_object_check_is_checked_at_runtime(self):
+        self.assertIsNone(IsOwnerEditor.role_statement("editor"))
+        self.assertIs(IsOwnerEditor.role_statement("viewer"), False)
+        self.assertEqual(specialize_permissions((IsOwnerEditor,), "editor"), (IsOwnerEditor,))
+
+        request = Request("editor", "alice")
+        self.assertTrue(IsOwnerEditor(request, obj=Obj("alice")).has_permission())
+        self.assertFalse(IsOwnerEditor(request, obj=Obj("bob")).has_permission())
+
+    def test_allow_all_subclass_is_checked_at_runtime(self):
+        self.assertIsNone(AllowOwner.role_statement("editor"))
+        self.assertEqual(specialize_permissions((AllowOwner,), "editor"), (AllowOwner,))
+
+    def test_or(self):
+        self.assertIs(Or(IsEditor, IsOwnerEditor).role_statement("editor"), True)
+        self.assertIsNone(Or(AllowNone, IsOwnerEditor).role_statement("editor"))
+        self.assertIs(Or(AllowNone, IsOwnerEditor).role_statement("viewer"), False)
@@ -0,0 +1,34 @@
+from unittest import TestCase, mock
+
+from django_describer.adapters.graphql.profiling import Profiler, StackSampler, logger
+
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        self.profiles = []
+        self.profiler = Profiler(rate=1, mode="cprofile", callback=self.profiles.append)
+
+    def test_cprofile(self):
+        self.assertEqual(self.profiler.profile("Q", lambda: 42), 42)
+        self.assertEqual(self.profiles[0].mode, "cprofile")
+        self.assertIsNotNone(self.profiles[0].get_stats())
+
+    def test_falls_back_to_sampling_if_another_profiler_is_active(self):
+        with mock.patch("django_describer.adapters.graphql.profiling.cProfile.Profile") as profile_class:
+            profile_class.return_value.enable.side_effect = ValueError("Another profiling tool is already active")
+            with self.assertLogs(logger, "WARNING"):
+                self.assertEqual(self.profiler.profile("Q", lambda: 42), 42)
+        self.assertEqual(self.profiles[0].mode, "sampling")
+        self.assertIsNone(self.profiles[0].get_stats())
+
+    def test_failing_profiler_does_not_fail_the_operation(self):
+        profiler = Profiler(rate=1, mode="sampling", callback=self.profiles.append)
+        with mock.patch.object(StackSampler, "start", side_effect=RuntimeError("can't start new thread")), \
+                self.assertLogs(logger, "ERROR"):
+            self.assertEqual(profiler.profile("Q", lambda: 42), 42)
+        self.assertEqual(self.profiles, [])
+
+    def test_failing_callback_does_not_fail_the_operation(self):
+        profiler = Profiler(rate=1, callback=mock.Mock(side_effect=OSError))
+        with self.assertLogs(logger, "ERROR"):
+            self.assertEqual(profiler.profile("Q", lambda: 42), 42)
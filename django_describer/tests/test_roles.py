@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+
+from django_describer.adapters.graphql.main import GraphQL
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+
+
+class RoleSchemaTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        adapter = GraphQL(job_workers=0)
+        cls.editor_schema = adapter.generate_schema(role="editor")
+        cls.viewer_schema = adapter.generate_schema(role="viewer")
+
+    def assertExposed(self, schema, exposed):
+        self.assertEqual("color" in schema.get_type("TagType").fields, exposed)
+        self.assertEqual("color" in schema.get_query_type().fields["TagList"].args, exposed)
+        self.assertEqual("color_Icontains" in schema.get_query_type().fields["TagList"].args, exposed)
+        self.assertEqual("color_ASC" in [value.name for value in schema.get_type("TagOrdering").values], exposed)
+        self.assertEqual("sum" in schema.get_type("TagAggregateType").fields, exposed)
+        self.assertEqual("groupBy" in schema.get_query_type().fields["TagAggregate"].args, exposed)
+
+    def test_granted_fields_are_exposed(self):
+        self.assertExposed(self.editor_schema, True)
+
+    def test_denied_fields_cannot_be_filtered_ordered_or_aggregated(self):
+        self.assertExposed(self.viewer_schema, False)
+        self.assertIn("name", self.viewer_schema.get_query_type().fields["TagList"].args)
+        self.assertIn("name_ASC", [value.name for value in self.viewer_schema.get_type("TagOrdering").values])
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from django_describer.actions import default_upsert, insert_on_conflict
+from django_describer.changes import get_changes
+from django_describer.models import Change
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+from .testapp.models import Publisher, Book, Tag
+
+
+class UpsertTest(TestCase):
+    def setUp(self):
+        self.first = Publisher.objects.create(name="First")
+        self.second = Publisher.objects.create(name="Second")
+        self.upsert = default_upsert(Book, ("isbn",))
+
+    def assertBookCounts(self, first, second):
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.book_count, self.second.book_count), (first, second))
+
+    def test_insert_and_update(self):
+        books = self.upsert(None, [{"isbn": "1", "name": "A", "page_count": 10}, {"isbn": "2", "name": "B"}])
+        self.assertEqual([book.name for book in books], ["A", "B"])
+        self.assertTrue(all(book.pk is not None for book in books))
+
+        books = self.upsert(None, [{"isbn": "1", "name": "A2"}, {"isbn": "3", "name": "C"}])
+        self.assertEqual([book.name for book in books], ["A2", "C"])
+        # fields missing in the rows are left as they are
+        self.assertEqual(Book.objects.get(isbn="1").page_count, 10)
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_rows_without_update_fields(self):
+        Book.objects.create(isbn="1", name="A")
+        books = self.upsert(None, [{"isbn": "1"}])
+        self.assertEqual(books[0].name, "A")
+
+    def test_counters(self):
+        self.upsert(None, [{"isbn": "1", "name": "A", "publisher_id": self.first.pk},
+                           {"isbn": "2", "name": "B", "publisher_id": self.first.pk}])
+        self.assertBookCounts(2, 0)
+
+        self.upsert(None, [{"isbn": "1", "publisher_id": self.second.pk}, {"isbn": "2", "name": "B2"}])
+        self.assertBookCounts(1, 1)
+
+    def test_change_log(self):
+        created = self.upsert(None, [{"isbn": "1", "name": "A"}])[0]
+        updated = Book.objects.create(isbn="2", name="B")
+        Change.objects.all().delete()
+
+        self.upsert(None, [{"isbn": "2", "name": "B2"}, {"isbn": "3", "name": "C"}])
+        new = Book.objects.get(isbn="3")
+        created_ids, updated_ids, deleted_ids, _, _ = get_changes(Book)
+        self.assertEqual(created_ids, [str(new.pk)])
+        self.assertEqual(updated_ids, [str(updated.pk)])
+        self.assertEqual(deleted_ids, [])
+        self.assertNotIn(str(created.pk), created_ids + updated_ids)
+
+    def test_fallback_sends_signals(self):
+        with mock.patch("django_describer.actions.supports_upsert", return_value=False):
+            self.upsert(None, [{"isbn": "1", "name": "A", "publisher_id": self.first.pk}])
+            self.upsert(None, [{"isbn": "1", "publisher_id": self.second.pk}])
+        self.assertBookCounts(0, 1)
+        self.assertEqual(Change.objects.filter(model="testapp.Book").count(), 2)
+
+    def test_non_auto_primary_key(self):
+        insert_on_conflict(Tag, ("name",), ["color"], [{"name": "a", "color": "red"}, {"name": "b"}])
+        insert_on_conflict(Tag, ("name",), ["color"], [{"name": "a", "color": "blue"}])
+        self.assertEqual(dict(Tag.objects.values_list("name", "color")), {"a": "blue", "b": "black"})
+        self.assertEqual(Tag.objects.exclude(id=None).count(), 2)
+
+        tags = default_upsert(Tag, ("name",))(None, [{"name": "c"}])
+        self.assertIsNotNone(tags[0].pk)
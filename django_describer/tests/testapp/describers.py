@@ -0,0 +1,42 @@
+from django_describer.actions import AggregateAction, ChangesAction, CustomObjectAction, UpsertAction
+from django_describer.datatypes import String
+from django_describer.describers import Describer
+from django_describer.permissions import Permission
+
+from .models import Publisher, Book, Tag
+
+
+class IsEditor(Permission):
+    roles = ("editor",)
+
+    def permission_statement(self):
+        return getattr(self.request, "role", None) == "editor"
+
+
+def rename_book(request, book, data):
+    book.name = data["name"]
+    book.save()
+    return {"object": book}
+
+
+class PublisherDescriber(Describer):
+    model = Publisher
+    counter_fields = {"books": "book_count"}
+    cacheable = True
+    upsert_action = UpsertAction(unique_fields="name", only_fields=("name",))
+
+
+class BookDescriber(Describer):
+    model = Book
+    changes_action = ChangesAction(settle_time=0)
+    upsert_action = UpsertAction(unique_fields="isbn")
+    extra_actions = {
+        "rename": CustomObjectAction(exec_fn=rename_book, extra_fields={"name": String()}, async_exec=True),
+    }
+
+
+class TagDescriber(Describer):
+    model = Tag
+    field_permissions = {"color": IsEditor, "weight": IsEditor}
+    upsert_action = UpsertAction(unique_fields="name")
+    aggregate_action = AggregateAction(fields=("weight",), group_by=("color",))
@@ -0,0 +1,22 @@
+import uuid
+
+from django.db import models
+
+
+class Publisher(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    book_count = models.IntegerField(default=0)
+
+
+class Book(models.Model):
+    name = models.CharField(max_length=50)
+    isbn = models.CharField(max_length=20, unique=True, null=True)
+    page_count = models.IntegerField(default=0)
+    publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE, null=True, related_name="books")
+
+
+class Tag(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    name = models.CharField(max_length=50, unique=True)
+    color = models.CharField(max_length=20, default="black")
+    weight = models.IntegerField(default=0)
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from django_describer.adapters.graphql.main import GraphQL
+
+from .testapp import describers  # noqa: F401 (registers the describers)
+
+
+adapter = GraphQL(job_workers=0)
+
+urlpatterns = [
+    path("graphql/", adapter.generate()),
+]
@@ -1,6 +1,7 @@
 import re
 
-from django.db.models import ManyToOneRel, ManyToManyRel
+from django.db.models import ManyToOneRel, ManyToManyRel, IntegerField, FloatField, DecimalField, ForeignKey, \
+    UniqueConstraint
 
 from .datatypes import get_instantiated_type
 
@@ -9,6 +10,8 @@ class AttrDict(dict):
     """
     A dictionary with keys accessible as attributes
     """
+    __slots__ = ()
+
     def __getattr__(self, item):
         return self[item]
 
@@ -41,25 +44,100 @@ def _reverse_fields(model, local_field_names):
     return list(__reverse_fields(model, local_field_names))
 
 
-def get_local_fields(model):
-    return [
-        (field.name, field)
-        for field in sorted(
-            list(model._meta.fields) + list(model._meta.local_many_to_many)
+def _indexed_field_names(model):
+    indexed = set()
+
+    for field in model._meta.fields:
+        if field.primary_key or field.unique or field.db_index:
+            indexed.add(field.name)
+
+    # partial indexes and constraints cover only some rows, so they don't make lookups of a field fast in general
+    for index in model._meta.indexes:
+        if index.fields and getattr(index, "condition", None) is None:
+            indexed.add(index.fields[0].lstrip("-"))
+
+    # index_together is removed in Django 5.1
+    for fields in tuple(getattr(model._meta, "index_together", ())) + tuple(model._meta.unique_together):
+        if fields:
+            indexed.add(fields[0])
+
+    for constraint in getattr(model._meta, "constraints", ()):
+        fields = getattr(constraint, "fields", ())
+        if fields and getattr(constraint, "condition", None) is None:
+            indexed.add(fields[0])
+
+    return frozenset(indexed)
+
+
+class ModelMeta:
+    """
+    Introspected fields of a model. Built once per model and shared by describers, filters, converters and mutation
+    inputs, so that the model's _meta and __dict__ are not scanned repeatedly.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.local_fields = tuple(
+            (field.name, field)
+            for field in sorted(
+                list(model._meta.fields) + list(model._meta.local_many_to_many)
+            )
         )
-    ]
+        self.local_field_names = field_names(self.local_fields)
 
+        # Make sure we don't duplicate local fields with "reverse" version
+        self.reverse_fields = tuple(_reverse_fields(model, self.local_field_names))
 
-def get_reverse_fields(model):
-    local_fields = get_local_fields(model)
+        self.all_fields = self.local_fields + self.reverse_fields
+        self.all_field_names = field_names(self.all_fields)
+        self.fields_by_name = dict(self.all_fields)
+        self.foreign_keys = {name: field for name, field in self.local_fields if isinstance(field, ForeignKey)}
+        self.indexed_field_names = _indexed_field_names(model)
+
+
+_model_meta_cache = {}  # key: Model, value: ModelMeta
+
+
+def get_model_meta(model):
+    if model not in _model_meta_cache:
+        _model_meta_cache[model] = ModelMeta(model)
+    return _model_meta_cache[model]
+
+
+def clear_model_meta_cache():
+    _model_meta_cache.clear()
 
-    # Make sure we don't duplicate local fields with "reverse" version
-    local_field_names = [field[0] for field in local_fields]
-    return _reverse_fields(model, local_field_names)
+
+def get_local_fields(model):
+    return list(get_model_meta(model).local_fields)
+
+
+def get_reverse_fields(model):
+    return list(get_model_meta(model).reverse_fields)
 
 
 def get_all_model_fields(model):
-    return get_local_fields(model) + get_reverse_fields(model)
+    return list(get_model_meta(model).all_fields)
+
+
+def is_unique_key(model, fields):
+    """
+    Whether the fields are covered by a unique constraint of the model.
+    """
+    fields = set(fields)
+    for field in model._meta.concrete_fields:
+        if field.unique and {field.name} == fields:
+            return True
+
+    unique_sets = [set(together) for together in model._meta.unique_together]
+    for constraint in getattr(model._meta, "constraints", ()):
+        # a partial constraint does not cover all rows
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None:
+            unique_sets.append(set(constraint.fields))
+    return fields in unique_sets
+
+
+def is_numeric_field(field):
+    return isinstance(field, (IntegerField, FloatField, DecimalField))
 
 
 def field_names(field_tuple):
@@ -68,9 +146,9 @@ def field_names(field_tuple):
 
 def determine_fields(model, only_fields, exclude_fields, no_reverse=False):
     if no_reverse:
-        all_fields = field_names(get_local_fields(model))
+        all_fields = get_model_meta(model).local_field_names
     else:
-        all_fields = field_names(get_all_model_fields(model))
+        all_fields = get_model_meta(model).all_field_names
 
     if only_fields is None and exclude_fields is None:
         exclude_fields = ()
@@ -94,6 +172,18 @@ def determine_fields(model, only_fields, exclude_fields, no_reverse=False):
     return tuple(f for f in all_fields if f not in exclude_fields)
 
 
+# lookups which can be answered by a B-tree index on the field
+indexable_lookups = ("exact", "gt", "gte", "in", "isnull", "lt", "lte", "range")
+
+
+def get_indexed_field_names(model):
+    """
+    Returns names of fields which are the leading column of some index: primary keys, unique fields, fields with
+    db_index (including foreign keys), Meta.indexes, Meta.index_together, Meta.unique_together and unique constraints.
+    """
+    return get_model_meta(model).indexed_field_names
+
+
 def model_plural_name(model):
     return str(model._meta.verbose_name_plural)
 
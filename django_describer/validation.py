@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+
+from .utils import get_model_meta
+
+
+class ForeignKeyError(ValueError):
+    """
+    Raised when foreign keys of the input data do not point to any object. Each error is a dict with the index of the
+    input row, the field and the value. The errors are exposed as GraphQL error extensions.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Referenced objects do not exist: {}.".format(
+            ", ".join("`{}` = {}".format(error["field"], error["value"]) for error in errors)))
+
+    @property
+    def extensions(self):
+        return {"code": "invalid_foreign_keys", "errors": self.errors}
+
+
+def _collect_references(model, rows):
+    """
+    Returns a list of (row index, foreign key, value) and the values grouped by (target model, target field name).
+    """
+    references = []
+    errors = []
+    values = defaultdict(set)
+
+    for index, row in enumerate(rows):
+        for name, field in get_model_meta(model).foreign_keys.items():
+            value = row.get(field.attname, None)
+            if value is None:
+                continue
+            try:
+                value = field.target_field.to_python(value)
+            except ValidationError:
+                errors.append({"index": index, "field": field.attname, "value": value})
+                continue
+            references.append((index, field, value))
+            values[(field.related_model, field.target_field.name)].add(value)
+
+    if errors:
+        raise ForeignKeyError(errors)
+    return references, values
+
+
+def validate_foreign_keys(request, model, rows, permissions=None):
+    """
+    Checks that foreign keys of each row of input data point to existing objects, using a single IN query per target
+    model. The objects referenced by foreign keys in permissions (key: foreign key name, value: permission classes) are
+    checked as well. Raises ForeignKeyError or PermissionError before anything is written.
+    """
+    permissions = permissions or {}
+    references, values = _collect_references(model, rows)
+
+    # objects are fetched only if some permissions need them, bare values are enough otherwise
+    needs_objects = {(field.related_model, field.target_field.name) for _, field, _ in references
+                     if field.name in permissions}
+
+    existing = {}  # key: (target model, target field name), value: dict or set of existing values
+    for (target_model, target_field), target_values in values.items():
+        # like ForeignKey.validate(), rows hidden by a filtering default manager are valid targets
+        qs = target_model._base_manager.all()
+        if (target_model, target_field) in needs_objects:
+            existing[(target_model, target_field)] = qs.in_bulk(target_values, field_name=target_field)
+        else:
+            existing[(target_model, target_field)] = set(qs.filter(**{
+                "{}__in".format(target_field): target_values}).values_list(target_field, flat=True))
+
+    errors = []
+    for index, field, value in references:
+        if value not in existing[(field.related_model, field.target_field.name)]:
+            errors.append({"index": index, "field": field.attname, "value": rows[index][field.attname]})
+    if errors:
+        raise ForeignKeyError(errors)
+
+    for index, field, value in references:
+        for permission_class in permissions.get(field.name, ()):
+            obj = existing[(field.related_model, field.target_field.name)][value]
+            pc = permission_class(request, obj=obj, data=rows[index])
+            if not pc.has_permission():
+                raise PermissionError(pc.error_message())